@@ -56,7 +56,10 @@ ASGI_APPLICATION = 'config.asgi.application'
 
 # Bestimmen des Pfades zur SQLite-Datenbank des Discord Bots
 BOT_DB_PATH = Path('/source/db/config.db') if Path('/source/db').exists() else BASE_DIR.parent / 'source' / 'db' / 'config.db'
+TICKETS_DB_PATH = BOT_DB_PATH.parent / 'tickets.db'
 DASHBOARD_DB_PATH = BASE_DIR / 'dashboard.db'
+# Archivierte Ticket-Transkripte (vom Bot unter data/transcripts geschrieben)
+TRANSCRIPTS_DIR = Path('/data/transcripts') if Path('/data').exists() else BASE_DIR.parent / 'data' / 'transcripts'
 
 DATABASES = {
     'default': {
@@ -66,6 +69,10 @@ DATABASES = {
     'bot': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BOT_DB_PATH,
+    },
+    'tickets': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': TICKETS_DB_PATH,
     }
 }
 
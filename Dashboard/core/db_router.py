@@ -1,13 +1,19 @@
+def _bot_db(model):
+    """Alias der Bot-Datenbank eines Models (use_bot_db -> 'bot', bot_db -> eigener Alias)"""
+    alias = getattr(model, 'bot_db', None)
+    if alias:
+        return alias
+    if getattr(model, 'use_bot_db', False):
+        return 'bot'
+    return None
+
+
 class BotDBRouter:
     def db_for_read(self, model, **hints):
-        if hasattr(model, 'use_bot_db') and model.use_bot_db:
-            return 'bot'
-        return None
+        return _bot_db(model)
 
     def db_for_write(self, model, **hints):
-        if hasattr(model, 'use_bot_db') and model.use_bot_db:
-            return 'bot'
-        return None
+        return _bot_db(model)
 
     def allow_relation(self, obj1, obj2, **hints):
         return None
@@ -16,7 +22,7 @@ class BotDBRouter:
         from django.apps import apps
         try:
             model = apps.get_model(app_label, model_name)
-            if hasattr(model, 'use_bot_db') and model.use_bot_db:
+            if _bot_db(model):
                 return False
         except LookupError:
             pass
@@ -18,3 +18,25 @@ class GuildConfig(models.Model):
 
     def __str__(self):
         return f"Guild {self.guild_id}"
+
+
+class Transcript(models.Model):
+    guild_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    channel_id = models.BigIntegerField()
+    channel_name = models.TextField(blank=True, null=True)
+    closed_by = models.BigIntegerField(blank=True, null=True)
+    path = models.TextField()
+    message_count = models.IntegerField(default=0)
+    attachment_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(blank=True, null=True)
+
+    bot_db = 'tickets'  # liegt in tickets.db des Bots
+
+    class Meta:
+        managed = False
+        db_table = 'transcripts'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Transkript {self.channel_name or self.channel_id}"
@@ -4,4 +4,6 @@ from . import views
 urlpatterns = [
     path('', views.dashboard_home, name='dashboard_home'),
     path('edit/<str:guild_id>/', views.edit_guild_config, name='edit_guild_config'),
+    path('transcripts/<int:guild_id>/', views.transcript_list, name='transcript_list'),
+    path('transcripts/download/<int:transcript_id>/', views.transcript_download, name='transcript_download'),
 ]
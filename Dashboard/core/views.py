@@ -1,8 +1,15 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.http import FileResponse, Http404
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from .models import GuildConfig
+from .models import GuildConfig, Transcript
 from .forms import GuildConfigForm
 
+TRANSCRIPTS_PER_PAGE = 50
+
 @login_required
 def dashboard_home(request):
     configs = GuildConfig.objects.all()
@@ -21,3 +28,20 @@ def edit_guild_config(request, guild_id):
         form = GuildConfigForm(instance=config)
 
     return render(request, 'core/edit_config.html', {'form': form, 'guild_id': guild_id})
+
+
+@login_required
+def transcript_list(request, guild_id):
+    # id als zweites Sortierkriterium, damit Seiten bei gleichem Zeitstempel stabil bleiben
+    transcripts = Transcript.objects.filter(guild_id=guild_id).order_by('-created_at', '-id')
+    page = Paginator(transcripts, TRANSCRIPTS_PER_PAGE).get_page(request.GET.get('page'))
+    return render(request, 'core/transcripts.html', {'transcripts': page, 'page': page, 'guild_id': guild_id})
+
+@login_required
+def transcript_download(request, transcript_id):
+    transcript = get_object_or_404(Transcript, pk=transcript_id)
+    base = Path(settings.TRANSCRIPTS_DIR).resolve()
+    path = (base / transcript.path).resolve()
+    if base not in path.parents or not path.is_file():
+        raise Http404("Transkript-Datei nicht gefunden")
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
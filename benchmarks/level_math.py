@@ -0,0 +1,41 @@
+"""
+Micro-Benchmark: alte Schleifen-Variante von LevelSystem.get_level vs. geschlossene Form.
+Ausführen mit: python -m benchmarks.level_math
+"""
+
+import random
+import timeit
+
+from source.levels import level_for_xp, levels_for
+
+
+def get_level_loop(xp):
+    lvl = 1
+    amount = 100
+
+    while True:
+        xp -= amount
+        if xp < 0:
+            return lvl
+        lvl += 1
+        amount += 100
+
+
+def main():
+    for xp in (0, 99, 100, 299, 300, 10_000, 1_000_000, 50_000_000):
+        assert get_level_loop(xp) == level_for_xp(xp), xp
+
+    print(f"{'XP':>12} {'Schleife (µs)':>15} {'Formel (µs)':>13} {'Faktor':>8}")
+    for xp in (1_000, 100_000, 1_000_000, 10_000_000, 100_000_000):
+        n = 2000
+        loop_us = timeit.timeit(lambda: get_level_loop(xp), number=n) / n * 1e6
+        closed_us = timeit.timeit(lambda: level_for_xp(xp), number=n) / n * 1e6
+        print(f"{xp:>12} {loop_us:>15.2f} {closed_us:>13.2f} {loop_us / closed_us:>7.0f}x")
+
+    values = [random.randint(0, 10_000_000) for _ in range(100_000)]
+    batch_s = timeit.timeit(lambda: levels_for(values), number=1)
+    print(f"\nlevels_for(): {len(values)} Werte in {batch_s * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,61 +1,753 @@
+import asyncio
+import io
+import logging
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left, bisect_right, insort
 import discord
-from discord.ext import commands
-from discord.commands import slash_command
+from discord.ext import commands, tasks
+from discord.commands import slash_command, Option
 import ezcord
-import aiosqlite
 import random
-import os
+import time
 from source.paths import get_level_db_path
+from source.database import database
+from source.settings import settings
+from source.levels import level_for_xp, level_progress
+from source.cards import render, render_rank_card
+from source.avatars import avatars
+
+logger = logging.getLogger('discord_bot')
+
+# Referenzen auf Hintergrund-Tasks (z.B. Flush beim Entladen), damit sie nicht eingesammelt werden
+_background_tasks: set[asyncio.Task] = set()
+
+
+def _run_in_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+# Write-Behind: XP wird im Speicher gesammelt und gebündelt geschrieben
+XP_FLUSH_INTERVAL = 10  # Sekunden
+XP_FLUSH_THRESHOLD = 500  # Events bis zum vorgezogenen Flush
+# Bereits geschriebene XP-Stände werden nach so langer Inaktivität aus dem Speicher entfernt
+XP_TOTALS_IDLE_SECONDS = 30 * 60
+
+# Standard-Meilensteine ("Level N"-Rollen), solange eine Guild keine eigenen Rollen konfiguriert hat
+DEFAULT_LEVEL_MILESTONES = [2, 5, 10, 20]
+
+# Rank-Cards: gerenderte PNGs werden pro (Guild, User, XP-Bucket) zwischengespeichert
+RANK_CARD_XP_BUCKET = 25
+RANK_CARD_CACHE_SIZE = 512
+
+# Tages-Rollups für /leaderboard zeitraum:tag/woche/monat
+XP_DAILY_RETENTION_DAYS = 90
+LEADERBOARD_PERIODS = {"tag": 1, "woche": 7, "monat": 30}
+
+# Alte, globale XP (vor Guild-Trennung) liegen unter dieser Guild-ID
+LEGACY_GUILD_ID = 0
+LEADERBOARD_PAGE_SIZE = 10
+LEADERBOARD_TOP_K = 100
+
+# Anti-Farming: Token Bucket pro (Guild, User) für Nachrichten-XP
+XP_COOLDOWN_SECONDS = 30  # so lange dauert es, bis ein Token nachgeladen ist
+XP_BURST = 2  # so viele Nachrichten hintereinander geben XP
+XP_LIMITER_SWEEP_MINUTES = 5
+
+
+class XPRateLimiter:
+    """
+    Token Bucket pro (guild_id, user_id) in kompakten Arrays:
+    key -> Slot-Index, tokens/last liegen als double in array('d').
+    Freie Slots werden wiederverwendet, inaktive Buckets werden regelmäßig entfernt.
+    """
+
+    def __init__(self, window: float = XP_COOLDOWN_SECONDS, burst: int = XP_BURST):
+        self.window = window
+        self.burst = burst
+        self._slots: dict[tuple[int, int], int] = {}
+        self._tokens = array("d")
+        self._last = array("d")
+        self._free: list[int] = []
+
+    def __len__(self):
+        return len(self._slots)
+
+    def allow(self, key: tuple[int, int], now: float) -> bool:
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._tokens[slot] = self.burst
+                self._last[slot] = now
+            else:
+                slot = len(self._tokens)
+                self._tokens.append(self.burst)
+                self._last.append(now)
+            self._slots[key] = slot
+        tokens = min(self.burst, self._tokens[slot] + (now - self._last[slot]) / self.window)
+        self._last[slot] = now
+        if tokens < 1:
+            self._tokens[slot] = tokens
+            return False
+        self._tokens[slot] = tokens - 1
+        return True
+
+    def evict_idle(self, now: float) -> int:
+        """Entfernt Buckets, die ohnehin wieder voll wären - verlustfrei, Speicher bleibt flach"""
+        refill = self.window * self.burst
+        idle = [key for key, slot in self._slots.items() if now - self._last[slot] >= refill]
+        for key in idle:
+            self._free.append(self._slots.pop(key))
+        return len(idle)
+
+
+# Voice-XP: ein gemeinsamer Tick für alle Sessions statt Timer pro User
+VOICE_TICK_SECONDS = 60
+VOICE_XP_PER_MINUTE = 5
+VOICE_TIER_AFTER = 2 * 60 * 60  # ab 2 Stunden am Stück ...
+VOICE_TIER_MULTIPLIER = 2.0  # ... gibt es doppelte XP
+
+
+class VoiceSession:
+    """Kompakter Zustand einer laufenden Voice-Session"""
+
+    __slots__ = ("channel_id", "started_at", "credited_until", "carry")
+
+    def __init__(self, channel_id: int, started_at: float, credited_until: float):
+        self.channel_id = channel_id
+        self.started_at = started_at
+        self.credited_until = credited_until
+        self.carry = 0.0  # Nachkommastellen, damit kurze Intervalle nicht verloren gehen
+
+    def accrue(self, until: float, multiplier: float) -> int:
+        """Berechnet die XP seit der letzten Gutschrift (inkl. Staffelung) und markiert sie als gutgeschrieben"""
+        start = self.credited_until
+        if until <= start:
+            return 0
+        tier_at = self.started_at + VOICE_TIER_AFTER
+        normal = max(0.0, min(until, tier_at) - start)
+        boosted = (until - start) - normal
+        minutes = (normal + boosted * VOICE_TIER_MULTIPLIER) / 60
+        raw = minutes * VOICE_XP_PER_MINUTE * multiplier + self.carry
+        xp = int(raw)
+        self.carry = raw - xp
+        self.credited_until = until
+        return xp
+
+
+class GuildRanking:
+    """
+    In-Memory Rangliste einer Guild:
+    - top: sortierte Top-K Liste von (-xp, user_id), wird bei jeder XP-Vergabe aktualisiert
+    - all_xp: sortierte (negierte) XP aller Member als Order-Statistics-Index,
+      daraus ergibt sich der Rang per bisect ohne COUNT(*)-Scan
+    """
+
+    __slots__ = ("k", "top", "all_xp")
+
+    def __init__(self, xp_by_user: dict[int, int], k: int = LEADERBOARD_TOP_K):
+        self.k = k
+        ordered = sorted((-xp, user_id) for user_id, xp in xp_by_user.items() if xp > 0)
+        self.top = ordered[:k]
+        self.all_xp = array("q", (key[0] for key in ordered))
+
+    @property
+    def complete(self) -> bool:
+        """True, wenn top alle Member enthält (Guild hat weniger als K Einträge)"""
+        return len(self.top) == len(self.all_xp)
+
+    def update(self, user_id: int, old_xp: int, new_xp: int):
+        if old_xp > 0:
+            idx = bisect_left(self.all_xp, -old_xp)
+            if idx < len(self.all_xp) and self.all_xp[idx] == -old_xp:
+                del self.all_xp[idx]
+            old_key = (-old_xp, user_id)
+            idx = bisect_left(self.top, old_key)
+            if idx < len(self.top) and self.top[idx] == old_key:
+                del self.top[idx]
+        if new_xp <= 0:
+            return
+        insort(self.all_xp, -new_xp)
+        new_key = (-new_xp, user_id)
+        # XP steigt nur: wer rausgefallen ist, kommt nur über die Schwelle wieder rein
+        if len(self.top) < self.k or new_key < self.top[-1]:
+            insort(self.top, new_key)
+            if len(self.top) > self.k:
+                self.top.pop()
+
+    def rank_of(self, xp: int) -> int:
+        """Platz = Anzahl Member mit mehr XP + 1"""
+        return bisect_left(self.all_xp, -xp) + 1
+
+    def page_after(self, key: tuple | None, size: int) -> list | None:
+        """Seite nach key (xp, user_id) aus dem Speicher, None wenn die Seite über Top-K hinausgeht"""
+        start = 0 if key is None else bisect_right(self.top, (-key[0], key[1]))
+        if start + size > len(self.top) and not self.complete:
+            return None
+        return [(user_id, -neg_xp) for neg_xp, user_id in self.top[start:start + size]]
+
+    def page_before(self, key: tuple, size: int) -> list | None:
+        """Seite vor key (xp, user_id) aus dem Speicher, None wenn sie (teilweise) außerhalb von Top-K liegt"""
+        end = bisect_left(self.top, (-key[0], key[1]))
+        # Key hinter dem letzten Top-K-Eintrag: die Seite davor kann aus der DB kommen
+        if not self.complete and (end == 0 or end == len(self.top)):
+            return None
+        return [(user_id, -neg_xp) for neg_xp, user_id in self.top[max(0, end - size):end]]
+
+
+class LeaderboardView(discord.ui.View):
+    """Blättern durch die Rangliste per Keyset-Pagination (kein OFFSET)"""
+
+    def __init__(self, cog: "LevelSystem", guild_id: int, rows: list, start_rank: int, has_next: bool):
+        super().__init__(timeout=300)
+        self.cog = cog
+        self.guild_id = guild_id
+        self.rows = rows
+        self.start_rank = start_rank
+        self.has_next = has_next
+        self._update_buttons()
+
+    def _update_buttons(self):
+        self.prev_button.disabled = self.start_rank <= 1
+        self.next_button.disabled = not self.has_next
+
+    @discord.ui.button(label="← Zurück", style=discord.ButtonStyle.secondary)
+    async def prev_button(self, button: discord.ui.Button, interaction: discord.Interaction):
+        first_user, first_xp = self.rows[0]
+        rows, _ = await self.cog.fetch_leaderboard_page(self.guild_id, before=(first_xp, first_user))
+        self.start_rank = max(1, self.start_rank - len(rows))
+        self.rows = rows
+        self.has_next = True
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.cog.leaderboard_embed(self.rows, self.start_rank), view=self)
+
+    @discord.ui.button(label="Weiter →", style=discord.ButtonStyle.blurple)
+    async def next_button(self, button: discord.ui.Button, interaction: discord.Interaction):
+        last_user, last_xp = self.rows[-1]
+        rows, has_next = await self.cog.fetch_leaderboard_page(self.guild_id, after=(last_xp, last_user))
+        if not rows:
+            self.has_next = False
+            self._update_buttons()
+            return await interaction.response.edit_message(view=self)
+        self.start_rank += len(self.rows)
+        self.rows = rows
+        self.has_next = has_next
+        self._update_buttons()
+        await interaction.response.edit_message(embed=self.cog.leaderboard_embed(self.rows, self.start_rank), view=self)
 
 
 class LevelSystem(ezcord.Cog, emoji="📶", description="Level System - Verdiene XP und steige auf"):
     def __init__(self, bot):
         self.bot = bot
         self.DB = get_level_db_path()
+        # (guild_id, user_id) -> [xp, msg_count] (aktueller Stand inkl. noch nicht geschriebener Deltas)
+        self._totals: dict[tuple[int, int], list[int]] = {}
+        # (guild_id, user_id) -> letzter Zugriff (monotonic), für das Entfernen inaktiver Einträge
+        self._totals_used: dict[tuple[int, int], float] = {}
+        # (guild_id, user_id) -> [xp_delta, msg_delta] (noch nicht in level.db)
+        self._pending: dict[tuple[int, int], list[int]] = {}
+        # (guild_id, user_id, day) -> [xp_delta, msg_delta] für xp_daily
+        self._pending_daily: dict[tuple[int, int, int], list[int]] = {}
+        self._pending_events = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        # guild_id -> GuildRanking (lazy geladen)
+        self._rankings: dict[int, GuildRanking] = {}
+        self._ranking_lock = asyncio.Lock()
+        # (guild_id, user_id) -> VoiceSession, plus beendete Sessions für den nächsten Checkpoint
+        self._voice_sessions: dict[tuple[int, int], VoiceSession] = {}
+        self._voice_ended: set[tuple[int, int]] = set()
+        self._voice_restored = False
+        self._xp_limiter = XPRateLimiter()
+        # guild_id -> {level: role_id}, einmal aufgelöst und bei Rollen-Änderungen verworfen
+        self._milestone_roles: dict[int, dict[int, int]] = {}
+        self._role_tasks: dict[int, asyncio.Task] = {}
+        # (guild_id, user_id, xp_bucket, avatar_key) -> PNG bytes (LRU)
+        self._card_cache: OrderedDict[tuple, bytes] = OrderedDict()
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self.flush_loop.is_running():
+            self.flush_loop.start()
+        if len(self.bot.guilds) == 1:
+            await self._claim_all_legacy_xp(self.bot.guilds[0].id)
+        # Bei jedem on_ready (auch nach einem Reconnect) abgleichen - verpasste Leave-Events werden nicht nachgeliefert
+        await self._sync_voice_sessions()
+        if not self.voice_tick.is_running():
+            self.voice_tick.start()
+        if not self.limiter_sweep.is_running():
+            self.limiter_sweep.start()
+        if not self.daily_retention.is_running():
+            self.daily_retention.start()
+
+    def cog_unload(self):
+        # stop() statt cancel(): ein laufender Flush wird nicht mittendrin abgebrochen
+        self.flush_loop.stop()
+        self.voice_tick.stop()
+        self.limiter_sweep.cancel()
+        self.daily_retention.cancel()
+        # Beim Neuladen des Cogs die restlichen XP trotzdem schreiben
+        _run_in_background(self._final_flush())
+
+    async def cog_shutdown(self):
+        """Wird beim Beenden des Bots aufgerufen: Voice-Zeit gutschreiben und ausstehende XP schreiben"""
+        self.flush_loop.stop()
+        self.voice_tick.stop()
+        await self._final_flush()
+
+    async def _final_flush(self):
+        await self._credit_all_voice(time.time())
+        # flush_xp wartet über den Lock auf einen eventuell noch laufenden Flush
+        await self.flush_xp()
+        await self._checkpoint_voice()
 
     @staticmethod
     def get_level(xp):
-        lvl = 1
-        amount = 100
+        return level_for_xp(xp)
+
+    async def _load_totals(self, guild_id: int, user_id: int) -> list[int]:
+        key = (guild_id, user_id)
+        self._totals_used[key] = time.monotonic()
+        totals = self._totals.get(key)
+        if totals is not None:
+            return totals
+        db = await database.get(self.DB)
+        row = await db.fetchone(
+            "SELECT xp, msg_count FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        )
+        claimed = False
+        if row is None:
+            row = await self._claim_legacy_xp(db, guild_id, user_id)
+            claimed = row is not None
+        # Während des awaits kann ein anderer Aufruf den User bereits geladen haben
+        if key in self._totals:
+            return self._totals[key]
+        totals = self._totals[key] = [row[0], row[1]] if row else [0, 0]
+        ranking = self._rankings.get(guild_id)
+        if claimed and ranking is not None:
+            ranking.update(user_id, 0, totals[0])
+        return totals
+
+    @staticmethod
+    async def _claim_legacy_xp(db, guild_id: int, user_id: int):
+        """Übernimmt globale XP aus der Zeit vor der Guild-Trennung in die erste aktive Guild"""
+        row = await db.fetchone(
+            "SELECT xp, msg_count FROM users WHERE guild_id = ? AND user_id = ?", (LEGACY_GUILD_ID, user_id)
+        )
+        if row is None:
+            return None
+        cursor = await db.execute(
+            "UPDATE OR IGNORE users SET guild_id = ? WHERE guild_id = ? AND user_id = ?",
+            (guild_id, LEGACY_GUILD_ID, user_id),
+        )
+        return row if cursor.rowcount else None
+
+    async def _claim_all_legacy_xp(self, guild_id: int):
+        """
+        Ist der Bot nur in einer Guild, gehören alle globalen XP zu ihr: einmal komplett übernehmen,
+        damit Rangliste und /rank nicht erst nach der nächsten Nachricht jedes Users vollständig sind.
+        """
+        db = await database.get(self.DB)
+        cursor = await db.execute(
+            "UPDATE OR IGNORE users SET guild_id = ? WHERE guild_id = ?", (guild_id, LEGACY_GUILD_ID)
+        )
+        if not cursor.rowcount:
+            return
+        async with self._ranking_lock:
+            # Rangliste beim nächsten Zugriff inklusive der übernommenen User neu laden
+            self._rankings.pop(guild_id, None)
+        logger.info(f"Globale XP von {cursor.rowcount} Usern nach Guild {guild_id} übernommen")
+
+    async def get_xp(self, guild_id: int, user_id: int):
+        totals = await self._load_totals(guild_id, user_id)
+        return totals[0]
+
+    async def grant_xp(self, guild_id: int, user_id: int, xp: int, messages: int = 0) -> tuple[int, int]:
+        """Addiert XP im Speicher und gibt (alter Stand, neuer Stand) zurück"""
+        key = (guild_id, user_id)
+        totals = await self._load_totals(guild_id, user_id)
+        old_xp = totals[0]
+        totals[0] += xp
+        totals[1] += messages
+
+        ranking = self._rankings.get(guild_id)
+        if ranking is not None and xp:
+            ranking.update(user_id, old_xp, totals[0])
+
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = [xp, messages]
+        else:
+            pending[0] += xp
+            pending[1] += messages
+
+        daily_key = (guild_id, user_id, self._today())
+        daily = self._pending_daily.get(daily_key)
+        if daily is None:
+            self._pending_daily[daily_key] = [xp, messages]
+        else:
+            daily[0] += xp
+            daily[1] += messages
+
+        self._pending_events += 1
+        if self._pending_events >= XP_FLUSH_THRESHOLD and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush_xp())
+        return old_xp, totals[0]
 
-        while True:
-            xp -= amount
-            if xp < 0:
-                return lvl
-            lvl += 1
-            amount += 100
+    @staticmethod
+    def _today() -> int:
+        return int(time.time() // 86400)
+
+    async def flush_xp(self):
+        """Schreibt alle gesammelten Deltas (Gesamt + Tages-Rollup) als Batch-UPSERT in einer Transaktion"""
+        async with self._flush_lock:
+            if not self._pending and not self._pending_daily:
+                return
+            batch, self._pending = self._pending, {}
+            daily_batch, self._pending_daily = self._pending_daily, {}
+            self._pending_events = 0
+            try:
+                db = await database.get(self.DB)
+                async with db.transaction() as conn:
+                    await conn.executemany(
+                        """
+                        INSERT INTO users (guild_id, user_id, xp, msg_count) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(guild_id, user_id) DO UPDATE SET
+                            xp = xp + excluded.xp,
+                            msg_count = msg_count + excluded.msg_count
+                        """,
+                        [(key[0], key[1], d[0], d[1]) for key, d in batch.items()],
+                    )
+                    await conn.executemany(
+                        """
+                        INSERT INTO xp_daily (guild_id, user_id, day, xp, msg_count) VALUES (?, ?, ?, ?, ?)
+                        ON CONFLICT(guild_id, day, user_id) DO UPDATE SET
+                            xp = xp + excluded.xp,
+                            msg_count = msg_count + excluded.msg_count
+                        """,
+                        [(key[0], key[1], key[2], d[0], d[1]) for key, d in daily_batch.items()],
+                    )
+            except BaseException as e:
+                # Auch bei Abbruch (CancelledError) zurückmergen - die Transaktion wurde zurückgerollt
+                logger.error(f"XP-Flush fehlgeschlagen, Deltas werden erneut versucht: {e!r}")
+                for target, source in ((self._pending, batch), (self._pending_daily, daily_batch)):
+                    for key, d in source.items():
+                        pending = target.setdefault(key, [0, 0])
+                        pending[0] += d[0]
+                        pending[1] += d[1]
+                if not isinstance(e, Exception):
+                    raise
+
+    @tasks.loop(hours=24)
+    async def daily_retention(self):
+        """Löscht Tages-Rollups außerhalb der Aufbewahrungsfrist und lässt SQLite die Statistiken auffrischen"""
+        cutoff = self._today() - XP_DAILY_RETENTION_DAYS
+        try:
+            db = await database.get(self.DB)
+            cursor = await db.execute("DELETE FROM xp_daily WHERE day < ?", (cutoff,))
+            await db.execute("PRAGMA optimize")
+            logger.info(f"XP-Rollups bereinigt: {cursor.rowcount} Zeilen älter als {XP_DAILY_RETENTION_DAYS} Tage")
+        except Exception as e:
+            logger.error(f"XP-Rollup-Bereinigung fehlgeschlagen: {e}")
+
+    async def get_ranking(self, guild_id: int) -> GuildRanking:
+        """Lädt die In-Memory Rangliste einer Guild einmalig aus level.db"""
+        ranking = self._rankings.get(guild_id)
+        if ranking is not None:
+            return ranking
+        async with self._ranking_lock:
+            ranking = self._rankings.get(guild_id)
+            if ranking is not None:
+                return ranking
+            await self.flush_xp()
+            db = await database.get(self.DB)
+            rows = await db.fetchall(
+                "SELECT user_id, xp FROM users WHERE guild_id = ? AND xp > 0", (guild_id,)
+            )
+            xp_by_user = {user_id: xp for user_id, xp in rows}
+            # XP, die während des Ladens vergeben wurden, stehen nur im Speicher
+            for (gid, user_id), totals in self._totals.items():
+                if gid == guild_id:
+                    xp_by_user[user_id] = totals[0]
+            ranking = self._rankings[guild_id] = GuildRanking(xp_by_user)
+            return ranking
+
+    @tasks.loop(seconds=XP_FLUSH_INTERVAL)
+    async def flush_loop(self):
+        await self.flush_xp()
+
+    @tasks.loop(minutes=XP_LIMITER_SWEEP_MINUTES)
+    async def limiter_sweep(self):
+        now = time.monotonic()
+        self._xp_limiter.evict_idle(now)
+        self._evict_idle_totals(now)
+
+    def _evict_idle_totals(self, now: float):
+        """Entfernt geschriebene (nicht mehr ausstehende) XP-Stände, die länger nicht benutzt wurden"""
+        # Während eines Flushes sind Deltas weder in _pending noch sicher in level.db
+        if self._flush_lock.locked():
+            return
+        cutoff = now - XP_TOTALS_IDLE_SECONDS
+        idle = [key for key, used in self._totals_used.items() if used < cutoff and key not in self._pending]
+        for key in idle:
+            self._totals.pop(key, None)
+            del self._totals_used[key]
+
+    # --- Voice-XP ---
+    @staticmethod
+    def _voice_channel_of(state: discord.VoiceState, guild: discord.Guild):
+        """Kanal, der für Voice-XP zählt (AFK-Kanal zählt nicht)"""
+        if state.channel is None or state.channel == guild.afk_channel:
+            return None
+        return state.channel
+
+    async def _voice_multipliers(self, guild_id: int) -> dict:
+        cfg = await settings.aget_config(guild_id)
+        return cfg.get("voice_xp_multipliers") or {}
+
+    async def _credit_session(self, guild_id: int, user_id: int, session: VoiceSession, now: float, multipliers: dict):
+        xp = session.accrue(now, float(multipliers.get(str(session.channel_id), 1.0)))
+        if xp <= 0:
+            return
+        old_xp, new_xp = await self.grant_xp(guild_id, user_id, xp)
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(user_id) if guild else None
+        if member is not None:
+            await self._reward_level_up(member, old_xp, new_xp)
+
+    def _end_voice_session(self, key: tuple[int, int]):
+        self._voice_sessions.pop(key, None)
+        self._voice_ended.add(key)
+
+    def _session_is_live(self, guild_id: int, user_id: int, session: VoiceSession) -> bool:
+        """Prüft eine Session gegen den echten Voice-Zustand des Members"""
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(user_id) if guild else None
+        if member is None or member.voice is None:
+            return False
+        channel = self._voice_channel_of(member.voice, guild)
+        return channel is not None and channel.id == session.channel_id
+
+    async def _credit_all_voice(self, now: float):
+        by_guild: dict[int, list] = {}
+        for (guild_id, user_id), session in list(self._voice_sessions.items()):
+            if not self._session_is_live(guild_id, user_id, session):
+                # Leave-Event verpasst (z.B. während eines Reconnects) - keine XP mehr für diese Session
+                self._end_voice_session((guild_id, user_id))
+                continue
+            by_guild.setdefault(guild_id, []).append((user_id, session))
+        for guild_id, sessions in by_guild.items():
+            multipliers = await self._voice_multipliers(guild_id)
+            for user_id, session in sessions:
+                try:
+                    await self._credit_session(guild_id, user_id, session, now, multipliers)
+                except Exception as e:
+                    logger.error(f"Voice-XP für {user_id} auf {guild_id} fehlgeschlagen: {e}")
+
+    async def _checkpoint_voice(self):
+        """Sichert alle laufenden Sessions gebündelt in level.db"""
+        ended, self._voice_ended = self._voice_ended, set()
+        rows = [
+            (guild_id, user_id, s.channel_id, s.started_at, s.credited_until)
+            for (guild_id, user_id), s in self._voice_sessions.items()
+        ]
+        if not ended and not rows:
+            return
+        db = await database.get(self.DB)
+        async with db.transaction() as conn:
+            if ended:
+                await conn.executemany(
+                    "DELETE FROM voice_sessions WHERE guild_id = ? AND user_id = ?", list(ended)
+                )
+            if rows:
+                await conn.executemany(
+                    """
+                    INSERT INTO voice_sessions (guild_id, user_id, channel_id, started_at, credited_until)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(guild_id, user_id) DO UPDATE SET
+                        channel_id = excluded.channel_id,
+                        started_at = excluded.started_at,
+                        credited_until = excluded.credited_until
+                    """,
+                    rows,
+                )
+
+    async def _sync_voice_sessions(self):
+        """
+        Gleicht die Sessions mit den Voice-Channels aller Guilds ab: Member ohne Session bekommen eine neue,
+        Sessions von Membern, die nicht mehr im Voice sind, werden beendet.
+        Beim ersten Aufruf nach einem Neustart werden Sessions aus den Checkpoints fortgesetzt
+        (Startzeit bleibt für die Staffelung erhalten). Die Zeit, in der der Bot offline war, wird nicht gutgeschrieben.
+        """
+        checkpoints: dict[tuple[int, int], float] = {}
+        if not self._voice_restored:
+            self._voice_restored = True
+            db = await database.get(self.DB)
+            rows = await db.fetchall("SELECT guild_id, user_id, started_at FROM voice_sessions")
+            checkpoints = {(guild_id, user_id): started_at for guild_id, user_id, started_at in rows}
+        now = time.time()
+        live: dict[tuple[int, int], int] = {}
+        synced_guilds = set()
+        for guild in self.bot.guilds:
+            if guild.unavailable:
+                continue  # Voice-Zustand unbekannt - Sessions dieser Guild nicht anfassen
+            synced_guilds.add(guild.id)
+            for channel in list(guild.voice_channels) + list(guild.stage_channels):
+                if channel == guild.afk_channel:
+                    continue
+                for member in channel.members:
+                    if not member.bot:
+                        live[(guild.id, member.id)] = channel.id
+
+        for key in list(self._voice_sessions):
+            if (key[0] in synced_guilds and key not in live) or self.bot.get_guild(key[0]) is None:
+                self._end_voice_session(key)
+        for key, channel_id in live.items():
+            session = self._voice_sessions.get(key)
+            started_at = checkpoints.pop(key, now)
+            if session is None:
+                self._voice_sessions[key] = VoiceSession(channel_id, started_at, now)
+                self._voice_ended.discard(key)
+            else:
+                session.channel_id = channel_id
+        self._voice_ended.update(checkpoints)
+        await self._checkpoint_voice()
+        logger.info(f"Voice-Sessions abgeglichen: {len(self._voice_sessions)}")
+
+    @tasks.loop(seconds=VOICE_TICK_SECONDS)
+    async def voice_tick(self):
+        await self._credit_all_voice(time.time())
+        await self._checkpoint_voice()
 
     @commands.Cog.listener()
-    async def on_ready(self):
-        # Hier muss noch Voice Time hinzugefügt werden damit man dafür auch XP bekommt, aktuell nur Message Count und XP für Messages
-        async with aiosqlite.connect(self.DB) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS users (
-                user_id INTEGER PRIMARY KEY,
-                msg_count INTEGER DEFAULT 0,
-                xp INTEGER DEFAULT 0
-                )"""
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+        if member.bot:
+            return
+        before_channel = self._voice_channel_of(before, member.guild)
+        after_channel = self._voice_channel_of(after, member.guild)
+        if before_channel == after_channel:
+            return  # nur Mute/Deaf o.ä. geändert
+
+        key = (member.guild.id, member.id)
+        session = self._voice_sessions.get(key)
+        if session is not None:
+            # Bisherige Zeit mit dem Multiplikator des alten Kanals gutschreiben
+            await self._credit_session(
+                member.guild.id, member.id, session, time.time(), await self._voice_multipliers(member.guild.id)
             )
-            await db.commit()
-
-    async def check_user(self, user_id):
-        async with aiosqlite.connect(self.DB) as db:
-            await db.execute("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
-            await db.commit()
-
-    async def get_xp(self, user_id):
-        await self.check_user(user_id)
-        async with aiosqlite.connect(self.DB) as db:
-            async with db.execute("SELECT xp FROM users WHERE user_id = ?", (user_id,)) as cursor:
-                result = await cursor.fetchone()
-        return result[0]
-
-    async def ensure_role(self, guild, role_name):
-        role = discord.utils.get(guild.roles, name=role_name)
-        if role is None:
-            role = await guild.create_role(name=role_name, color=discord.Color.blue())
-        return role
+
+        if after_channel is None:
+            self._end_voice_session(key)
+        elif session is None or key not in self._voice_sessions:
+            now = time.time()
+            self._voice_sessions[key] = VoiceSession(after_channel.id, now, now)
+            self._voice_ended.discard(key)
+        else:
+            session.channel_id = after_channel.id
+
+    @slash_command(name="voice_xp_bonus", description="Setzt den Voice-XP-Multiplikator für einen Kanal")
+    @commands.has_permissions(administrator=True)
+    async def voice_xp_bonus(
+        self,
+        ctx: discord.ApplicationContext,
+        kanal: Option(discord.VoiceChannel, "Voice-Kanal"),
+        multiplikator: Option(float, "z.B. 1.5 (1 = Standard, 0 = keine XP)", min_value=0, max_value=10),
+    ):
+        multipliers = await self._voice_multipliers(ctx.guild.id)
+        if multiplikator == 1:
+            multipliers.pop(str(kanal.id), None)
+        else:
+            multipliers[str(kanal.id)] = multiplikator
+        await settings.aupdate_config(ctx.guild.id, {"voice_xp_multipliers": multipliers})
+        await ctx.respond(f"✅ Voice-XP in {kanal.mention}: x{multiplikator:g}", ephemeral=True)
+
+    # --- Meilenstein-Rollen ---
+    async def _milestone_roles_for(self, guild: discord.Guild) -> dict[int, int]:
+        """
+        {level: role_id} einer Guild. Konfigurierte Rollen kommen aus der Config (level_role_ids),
+        sonst werden die Standard-"Level N"-Rollen einmalig per Name aufgelöst und fehlende im Hintergrund erstellt.
+        Wird erst beim ersten Level-Up einer Guild aufgerufen - nie für alle Guilds beim Start.
+        """
+        mapping = self._milestone_roles.get(guild.id)
+        if mapping is not None:
+            return mapping
+        cfg = await settings.aget_config(guild.id)
+        configured = cfg.get("level_role_ids") or {}
+        if configured:
+            mapping = {
+                int(level): int(role_id)
+                for level, role_id in configured.items()
+                if role_id and guild.get_role(int(role_id))
+            }
+        else:
+            roles_by_name = {role.name: role.id for role in guild.roles}
+            mapping = {}
+            missing = []
+            for level in DEFAULT_LEVEL_MILESTONES:
+                role_id = roles_by_name.get(f"Level {level}")
+                if role_id:
+                    mapping[level] = role_id
+                else:
+                    missing.append(level)
+            if missing:
+                self._schedule_role_creation(guild, missing)
+        self._milestone_roles[guild.id] = mapping
+        return mapping
+
+    def _schedule_role_creation(self, guild: discord.Guild, levels: list[int]):
+        task = self._role_tasks.get(guild.id)
+        if task is None or task.done():
+            self._role_tasks[guild.id] = asyncio.create_task(self._create_milestone_roles(guild, levels))
+
+    async def _create_milestone_roles(self, guild: discord.Guild, levels: list[int]):
+        for level in levels:
+            try:
+                role = await guild.create_role(name=f"Level {level}", color=discord.Color.blue())
+            except Exception as e:
+                logger.warning(f"Konnte Rolle 'Level {level}' auf {guild.id} nicht erstellen: {e}")
+                continue
+            mapping = self._milestone_roles.get(guild.id)
+            if mapping is not None:
+                mapping[level] = role.id
+
+    def _invalidate_milestones(self, role: discord.Role, *names: str):
+        mapping = self._milestone_roles.get(role.guild.id)
+        if mapping is None:
+            return
+        if role.id in mapping.values() or any(name.startswith("Level ") for name in names):
+            self._milestone_roles.pop(role.guild.id, None)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        self._invalidate_milestones(role, role.name)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        if before.name != after.name:
+            self._invalidate_milestones(after, before.name, after.name)
+
+    @slash_command(name="level_rolle", description="Legt fest, welche Rolle man ab einem Level bekommt")
+    @commands.has_permissions(administrator=True)
+    async def level_rolle(
+        self,
+        ctx: discord.ApplicationContext,
+        level: Option(int, "Ab diesem Level", min_value=2, max_value=1000),
+        rolle: Option(discord.Role, "Rolle (leer lassen zum Entfernen)", required=False, default=None),
+    ):
+        cfg = await settings.aget_config(ctx.guild.id)
+        level_roles = cfg.get("level_role_ids") or {}
+        if rolle is None:
+            level_roles.pop(str(level), None)
+        else:
+            level_roles[str(level)] = str(rolle.id)
+        await settings.aupdate_config(ctx.guild.id, {"level_role_ids": level_roles})
+        self._milestone_roles.pop(ctx.guild.id, None)
+        text = f"✅ Level {level} → {rolle.mention}" if rolle else f"✅ Rolle für Level {level} entfernt"
+        await ctx.respond(text, ephemeral=True)
 
 # Event-Listener für Nachrichten, um XP für NAchrichten zu vergeben und Level-Ups zu erkennen
     @commands.Cog.listener()
@@ -64,59 +756,182 @@ class LevelSystem(ezcord.Cog, emoji="📶", description="Level System - Verdiene
             return
         if not message.guild:
             return
+        # Nachrichten im Cooldown geben keine XP (und erzeugen keine DB-Arbeit)
+        if not self._xp_limiter.allow((message.guild.id, message.author.id), time.monotonic()):
+            return
         xp = random.randint(10, 20)
 
-        await self.check_user(message.author.id)
-        async with aiosqlite.connect(self.DB) as db:
-            await db.execute(
-                "UPDATE users SET msg_count = msg_count + 1, xp = xp + ? WHERE user_id = ?", (xp, message.author.id)
-            )
-            await db.commit()
-
-        new_xp = await self.get_xp(message.author.id)
+        old_xp, new_xp = await self.grant_xp(message.guild.id, message.author.id, xp, messages=1)
+        await self._reward_level_up(message.author, old_xp, new_xp, message.channel)
 
-        old_level = self.get_level(new_xp - xp)
+    async def _reward_level_up(self, member: discord.Member, old_xp: int, new_xp: int, channel=None):
+        """Vergibt Meilenstein-Rollen bei einem Level-Up (Nachrichten und Voice)"""
+        old_level = self.get_level(old_xp)
         new_level = self.get_level(new_xp)
 
         if old_level == new_level:
             return
 
-        level_milestones = [2, 5, 10, 20]
-        if new_level in level_milestones:
-            role_name = f"Level {new_level}"
-            role = await self.ensure_role(message.guild, role_name)
-            await message.author.add_roles(role)
-            await message.channel.send(f"Level Up! Du hast die Rolle {role.mention} erhalten!", ephemeral=True)
+        milestones = await self._milestone_roles_for(member.guild)
+        # Auch übersprungene Meilensteine vergeben (z.B. große Voice-Gutschrift).
+        # Nur bereits aufgelöste Rollen - auf eine Rollen-Erstellung im Hintergrund wird nicht gewartet
+        reached = [level for level in range(old_level + 1, new_level + 1) if level in milestones]
+        roles = [role for role in (member.guild.get_role(milestones[level]) for level in reached) if role]
+        if roles:
+            # REST-Aufrufe laufen im Hintergrund und halten weder den Voice-Tick noch den Flush beim Beenden auf
+            _run_in_background(self._grant_roles(member, roles, channel))
 
-
-# Hier werden Eventlistene und mehr kommen um die Zeit zu messen die ein User in einem Voice Channel verbringt und aufgrund dessen XP vergeben
-# z.B XP pro Minute in Voice Channel, Bonus XP für bestimmte Kanäle, etc. Außerdem könnte man gestaffelt XP geben für mehr Zeit z.B nach 2 Stunden doppelt so viel XP
+    @staticmethod
+    async def _grant_roles(member: discord.Member, roles: list[discord.Role], channel=None):
+        try:
+            await member.add_roles(*roles)
+            if channel is not None:
+                await channel.send(f"Level Up! Du hast die Rolle {roles[-1].mention} erhalten!", ephemeral=True)
+        except Exception as e:
+            logger.warning(f"Level-Rollen für {member.id} auf {member.guild.id} konnten nicht vergeben werden: {e}")
 
     @slash_command()
     async def rank(self, ctx):
-        xp = await self.get_xp(ctx.author.id)
-        lvl = self.get_level(xp)
-        await ctx.respond(f"Du hast **{xp}** XP und bist Level **{lvl}**", ephemeral=True)
+        # Zuerst bestätigen - das Ranking kann bei kaltem Cache länger als 3 Sekunden brauchen
+        await ctx.defer(ephemeral=True)
+        xp = await self.get_xp(ctx.guild.id, ctx.author.id)
+        lvl, _, missing = level_progress(xp)
+        ranking = await self.get_ranking(ctx.guild.id)
+        position = f"Platz **#{ranking.rank_of(xp)}**" if xp > 0 else "noch ohne Platzierung"
+        text = f"Du hast **{xp}** XP und bist Level **{lvl}** (noch {missing} XP bis Level {lvl + 1}), {position}"
 
-    @slash_command()
-    async def leaderboard(self, ctx):
+        try:
+            card = await self.rank_card(ctx.author, xp)
+        except Exception as e:
+            logger.warning(f"Rank-Card konnte nicht gerendert werden: {e}")
+            return await ctx.respond(text, ephemeral=True)
+        await ctx.respond(text, file=discord.File(io.BytesIO(card), filename="rank.png"), ephemeral=True)
+
+    async def rank_card(self, member: discord.Member, xp: int) -> bytes:
+        """Rank-Card als PNG - aus dem Cache oder im Prozess-Pool gerendert"""
+        bucket_xp = xp - xp % RANK_CARD_XP_BUCKET
+        key = (member.guild.id, member.id, bucket_xp, member.display_avatar.key)
+        card = self._card_cache.get(key)
+        if card is not None:
+            self._card_cache.move_to_end(key)
+            return card
+
+        level, xp_into_level, missing = level_progress(bucket_xp)
+        avatar_bytes = await avatars.fetch(member.display_avatar)
+        card = await render(
+            render_rank_card, avatar_bytes, member.display_name, level, xp_into_level, xp_into_level + missing
+        )
+        self._card_cache[key] = card
+        while len(self._card_cache) > RANK_CARD_CACHE_SIZE:
+            self._card_cache.popitem(last=False)
+        return card
+
+    async def fetch_leaderboard_page(self, guild_id: int, after: tuple | None = None, before: tuple | None = None):
+        """
+        Eine Seite der Rangliste über den Index (guild_id, xp DESC, user_id).
+        after/before = (xp, user_id) der letzten/ersten Zeile der aktuellen Seite.
+        Gibt (rows, has_more) zurück.
+        Seiten innerhalb der Top-K kommen aus dem Speicher, alles danach aus level.db.
+        """
+        ranking = await self.get_ranking(guild_id)
+        if before is not None:
+            rows = ranking.page_before(before, LEADERBOARD_PAGE_SIZE)
+            if rows is not None:
+                return rows, True
+        else:
+            rows = ranking.page_after(after, LEADERBOARD_PAGE_SIZE + 1)
+            if rows is not None:
+                return rows[:LEADERBOARD_PAGE_SIZE], len(rows) > LEADERBOARD_PAGE_SIZE
+
+        await self.flush_xp()
+        db = await database.get(self.DB)
+        limit = LEADERBOARD_PAGE_SIZE + 1
+        if before is not None:
+            xp, user_id = before
+            rows = await db.fetchall(
+                """
+                SELECT user_id, xp FROM users
+                WHERE guild_id = ? AND xp > 0 AND (xp > ? OR (xp = ? AND user_id < ?))
+                ORDER BY xp ASC, user_id DESC
+                LIMIT ?
+                """,
+                (guild_id, xp, xp, user_id, limit),
+            )
+            rows = [tuple(r) for r in reversed(rows[:LEADERBOARD_PAGE_SIZE])]
+            return rows, len(rows) == LEADERBOARD_PAGE_SIZE
+        if after is not None:
+            xp, user_id = after
+            rows = await db.fetchall(
+                """
+                SELECT user_id, xp FROM users
+                WHERE guild_id = ? AND xp > 0 AND (xp < ? OR (xp = ? AND user_id > ?))
+                ORDER BY xp DESC, user_id ASC
+                LIMIT ?
+                """,
+                (guild_id, xp, xp, user_id, limit),
+            )
+        else:
+            rows = await db.fetchall(
+                """
+                SELECT user_id, xp FROM users
+                WHERE guild_id = ? AND xp > 0
+                ORDER BY xp DESC, user_id ASC
+                LIMIT ?
+                """,
+                (guild_id, limit),
+            )
+        return [tuple(r) for r in rows[:LEADERBOARD_PAGE_SIZE]], len(rows) > LEADERBOARD_PAGE_SIZE
+
+    def leaderboard_embed(self, rows: list, start_rank: int) -> discord.Embed:
         desc = ""
-        counter = 1
-        async with aiosqlite.connect(self.DB) as db:
-            async with db.execute(
-                    "SELECT user_id, xp FROM users WHERE msg_count > 0 ORDER BY xp DESC LIMIT 10"
-            ) as cursor:
-                async for user_id, xp in cursor:
-                    desc += f"{counter}. <@{user_id}> - {xp} XP\n"
-                    counter += 1
+        for counter, (user_id, xp) in enumerate(rows, start=start_rank):
+            desc += f"{counter}. <@{user_id}> - {xp} XP\n"
 
         embed = discord.Embed(
             title="Rangliste",
-            description=desc,
+            description=desc or "Noch keine Einträge.",
             color=discord.Color.yellow()
         )
         embed.set_thumbnail(url=self.bot.user.avatar.url)
-        await ctx.respond(embed=embed, ephemeral=True)
+        return embed
+
+    async def fetch_period_leaderboard(self, guild_id: int, days: int) -> list:
+        """Top-Liste für die letzten `days` Tage (Range-Query über den Primärschlüssel von xp_daily)"""
+        await self.flush_xp()
+        db = await database.get(self.DB)
+        rows = await db.fetchall(
+            """
+            SELECT user_id, SUM(xp) AS total FROM xp_daily
+            WHERE guild_id = ? AND day > ?
+            GROUP BY user_id
+            HAVING total > 0
+            ORDER BY total DESC, user_id ASC
+            LIMIT ?
+            """,
+            (guild_id, self._today() - days, LEADERBOARD_PAGE_SIZE),
+        )
+        return [tuple(r) for r in rows]
+
+    @slash_command()
+    async def leaderboard(
+        self,
+        ctx,
+        zeitraum: Option(str, "Zeitraum", choices=["gesamt", "tag", "woche", "monat"], required=False, default="gesamt"),
+    ):
+        # Zuerst bestätigen - Flush und Rangliste/GROUP BY können bei kaltem Cache länger als 3 Sekunden brauchen
+        await ctx.defer(ephemeral=True)
+        if zeitraum in LEADERBOARD_PERIODS:
+            rows = await self.fetch_period_leaderboard(ctx.guild.id, LEADERBOARD_PERIODS[zeitraum])
+            embed = self.leaderboard_embed(rows, 1)
+            embed.title = f"Rangliste ({zeitraum})"
+            return await ctx.respond(embed=embed, ephemeral=True)
+
+        rows, has_next = await self.fetch_leaderboard_page(ctx.guild.id)
+        embed = self.leaderboard_embed(rows, 1)
+        if not rows:
+            return await ctx.respond(embed=embed, ephemeral=True)
+        view = LeaderboardView(self, ctx.guild.id, rows, 1, has_next)
+        await ctx.respond(embed=embed, view=view, ephemeral=True)
 
 def setup(bot):
     bot.add_cog(LevelSystem(bot))
@@ -2,6 +2,7 @@ import discord
 import ezcord
 from discord.commands import slash_command, Option
 from discord.ext import commands
+from source import cards
 
 
 class OwnerCmds(ezcord.Cog, emoji="🔑", description="Bot Owner Commands - Nur für den Bot Owner", hidden=False):
@@ -24,6 +25,19 @@ class OwnerCmds(ezcord.Cog, emoji="🔑", description="Bot Owner Commands - Nur
         await self.bot.change_presence(activity=activity, status=discord.Status.dnd)
         await ctx.respond("Status was changed!")
 
+    @slash_command(description="Owner Only Command - Renderzeiten der Bild-Worker")
+    @commands.is_owner()
+    async def render_stats(self, ctx):
+        stats = cards.render_stats()
+        if not stats:
+            await ctx.respond("Noch keine Bilder gerendert.", ephemeral=True)
+            return
+        lines = [
+            f"`{name}`: {s['count']}x · p50 {s['p50_ms']} ms · p99 {s['p99_ms']} ms"
+            for name, s in sorted(stats.items())
+        ]
+        await ctx.respond("\n".join(lines), ephemeral=True)
+
 
 def setup(bot):
     bot.add_cog(OwnerCmds(bot))
\ No newline at end of file
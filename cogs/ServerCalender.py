@@ -1,14 +1,13 @@
 import discord
-import sqlite3
 from datetime import datetime, timedelta, timezone
 
-import aiosqlite
 import discord
 import ezcord
 from discord.commands import Option, slash_command
 import pytz
 
 from source.paths import get_config_db_path
+from source.database import database
 
 
 BERLIN_TZ = pytz.timezone("Europe/Berlin")
@@ -18,29 +17,6 @@ class ServerCalender(ezcord.Cog, emoji="🗓️", description="Kalender-Events e
     def __init__(self, bot):
         self.bot = bot
         self.db_path = get_config_db_path()
-        self._init_db()
-
-    def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS calendar_events (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                guild_id INTEGER NOT NULL,
-                title TEXT NOT NULL,
-                description TEXT,
-                start_time TEXT NOT NULL,
-                end_time TEXT NOT NULL,
-                location TEXT,
-                creator_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        conn.commit()
-        conn.close()
 
     @staticmethod
     def _parse_local_datetime(date_value: str, time_value: str) -> datetime:
@@ -74,18 +50,16 @@ class ServerCalender(ezcord.Cog, emoji="🗓️", description="Kalender-Events e
         return embed
 
     async def _fetch_event(self, guild_id: int, event_id: int):
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute(
-                """
-                SELECT id, guild_id, title, description, start_time, end_time, location, creator_id
-                FROM calendar_events
-                WHERE guild_id = ? AND id = ?
-                """,
-                (guild_id, event_id),
-            ) as cursor:
-                row = await cursor.fetchone()
-                return dict(row) if row else None
+        db = await database.get(self.db_path)
+        row = await db.fetchone(
+            """
+            SELECT id, guild_id, title, description, start_time, end_time, location, creator_id
+            FROM calendar_events
+            WHERE guild_id = ? AND id = ?
+            """,
+            (guild_id, event_id),
+        )
+        return dict(row) if row else None
 
     @staticmethod
     def _can_manage_calendar(member: discord.Member) -> bool:
@@ -125,24 +99,23 @@ class ServerCalender(ezcord.Cog, emoji="🗓️", description="Kalender-Events e
 
         end_utc = start_utc + timedelta(minutes=dauer_minuten)
 
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                """
-                INSERT INTO calendar_events (guild_id, title, description, start_time, end_time, location, creator_id)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    ctx.guild.id,
-                    titel.strip(),
-                    beschreibung.strip(),
-                    start_utc.isoformat(),
-                    end_utc.isoformat(),
-                    ort.strip(),
-                    ctx.author.id,
-                ),
-            )
-            await db.commit()
-            event_id = cursor.lastrowid
+        db = await database.get(self.db_path)
+        cursor = await db.execute(
+            """
+            INSERT INTO calendar_events (guild_id, title, description, start_time, end_time, location, creator_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                ctx.guild.id,
+                titel.strip(),
+                beschreibung.strip(),
+                start_utc.isoformat(),
+                end_utc.isoformat(),
+                ort.strip(),
+                ctx.author.id,
+            ),
+        )
+        event_id = cursor.lastrowid
 
         created_event = await self._fetch_event(ctx.guild.id, event_id)
         embed = self._build_event_embed("✅ Event erstellt", created_event, discord.Color.green())
@@ -155,19 +128,17 @@ class ServerCalender(ezcord.Cog, emoji="🗓️", description="Kalender-Events e
         limit: Option(int, "Wie viele Events sollen angezeigt werden?", required=False, default=10, min_value=1, max_value=25),
     ):
         now_iso = datetime.now(timezone.utc).isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
-            db.row_factory = aiosqlite.Row
-            async with db.execute(
-                """
-                SELECT id, title, start_time, end_time, location
-                FROM calendar_events
-                WHERE guild_id = ? AND start_time >= ?
-                ORDER BY start_time ASC
-                LIMIT ?
-                """,
-                (ctx.guild.id, now_iso, limit),
-            ) as cursor:
-                rows = await cursor.fetchall()
+        db = await database.get(self.db_path)
+        rows = await db.fetchall(
+            """
+            SELECT id, title, start_time, end_time, location
+            FROM calendar_events
+            WHERE guild_id = ? AND start_time >= ?
+            ORDER BY start_time ASC
+            LIMIT ?
+            """,
+            (ctx.guild.id, now_iso, limit),
+        )
 
         if not rows:
             await ctx.respond("📭 Es sind keine kommenden Events vorhanden.", ephemeral=True)
@@ -210,12 +181,11 @@ class ServerCalender(ezcord.Cog, emoji="🗓️", description="Kalender-Events e
             await ctx.respond("❌ Event nicht gefunden.", ephemeral=True)
             return
 
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "DELETE FROM calendar_events WHERE guild_id = ? AND id = ?",
-                (ctx.guild.id, event_id),
-            )
-            await db.commit()
+        db = await database.get(self.db_path)
+        await db.execute(
+            "DELETE FROM calendar_events WHERE guild_id = ? AND id = ?",
+            (ctx.guild.id, event_id),
+        )
 
         await ctx.respond(f"🗑️ Event `#{event_id}` wurde gelöscht.", ephemeral=True)
 
@@ -275,24 +245,23 @@ class ServerCalender(ezcord.Cog, emoji="🗓️", description="Kalender-Events e
         final_description = beschreibung.strip() if beschreibung is not None else event_data["description"]
         final_location = ort.strip() if ort is not None else event_data["location"]
 
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                UPDATE calendar_events
-                SET title = ?, description = ?, start_time = ?, end_time = ?, location = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE guild_id = ? AND id = ?
-                """,
-                (
-                    final_title,
-                    final_description,
-                    new_start_utc.isoformat(),
-                    new_end_utc.isoformat(),
-                    final_location,
-                    ctx.guild.id,
-                    event_id,
-                ),
-            )
-            await db.commit()
+        db = await database.get(self.db_path)
+        await db.execute(
+            """
+            UPDATE calendar_events
+            SET title = ?, description = ?, start_time = ?, end_time = ?, location = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE guild_id = ? AND id = ?
+            """,
+            (
+                final_title,
+                final_description,
+                new_start_utc.isoformat(),
+                new_end_utc.isoformat(),
+                final_location,
+                ctx.guild.id,
+                event_id,
+            ),
+        )
 
         updated_event = await self._fetch_event(ctx.guild.id, event_id)
         embed = self._build_event_embed("✏️ Event bearbeitet", updated_event, discord.Color.orange())
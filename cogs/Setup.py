@@ -305,7 +305,7 @@ class Step4View(discord.ui.View):
             "ticket_embed_channel_id": self.ticket_embed_channel_id,
             "ticket_category_id": self.ticket_category_id,
         }
-        settings.update_config(self.guild.id, updates)
+        await settings.aupdate_config(self.guild.id, updates)
         embed = discord.Embed(title="✅ Konfiguration gespeichert", color=discord.Color.green())
         def mention_role(rid: str):
             r = self.guild.get_role(int(rid)) if rid else None
@@ -1,50 +1,30 @@
 import discord
 from discord.ext import commands
 from discord.ui import Button, View, Select
-import aiosqlite
-import os
 import asyncio
 import ezcord
 import logging
 import json
+import time
 from source.paths import get_tickets_db_path
 from source.settings import settings
+from source.database import database
+from source.transcripts import archive_channel
 
 logger = logging.getLogger('discord_bot')
 
 # Konstanten
 DB_PATH = get_tickets_db_path()
-DB_FOLDER = os.path.dirname(DB_PATH)
-
-
-async def _load_config_from_db(guild_id: int):
-    """Lade die Ticket-Konfiguration aus der Datenbank"""
-    try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute('''
-                SELECT allowed_roles FROM ticket_config WHERE guild_id = ?
-            ''', (guild_id,)) as cursor:
-                result = await cursor.fetchone()
-                if result:
-                    return json.loads(result[0])  # allowed_roles ist JSON String
-                return []
-    except Exception as e:
-        logger.error(f"Fehler beim Laden der Ticket-Config aus DB: {e}")
-        return []
-
-
-async def _save_config_to_db(guild_id: int, allowed_role_ids: list, role_names: list):
-    """Speichere die Ticket-Konfiguration in der Datenbank"""
-    try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            allowed_roles_json = json.dumps(allowed_role_ids)
-            await db.execute('''
-                INSERT OR REPLACE INTO ticket_config (guild_id, allowed_roles, role_names)
-                VALUES (?, ?, ?)
-            ''', (guild_id, allowed_roles_json, json.dumps(role_names)))
-            await db.commit()
-    except Exception as e:
-        logger.error(f"Fehler beim Speichern der Ticket-Config in DB: {e}")
+CREATE_TICKET_ID = "ticket:create"
+CLOSE_TICKET_ID = "ticket:close"
+# Ticket-Erstellung pro Guild: so viele gleichzeitig, maximal so viele wartend
+TICKET_CREATE_CONCURRENCY = 2
+TICKET_CREATE_QUEUE_MAX = 25
+TICKET_WRITE_RETRY_DELAY = 1  # Sekunden, verdoppelt sich pro Fehlschlag
+TICKET_WRITE_RETRY_MAX_DELAY = 60
+TICKET_CATEGORY_NAME = "🎫 Support Tickets"
+# Keys in config.db, die das Ticket-Profil einer Guild betreffen
+TICKET_CONFIG_KEYS = {"ticket_role_ids", "ticket_category_id"}
 
 
 class RoleSelectDropdown(Select):
@@ -77,10 +57,9 @@ class RoleSelectDropdown(Select):
         await interaction.response.defer()
         
         selected_role_ids = [int(role_id) for role_id in self.values]
-        role_names = [self.guild.get_role(rid).name for rid in selected_role_ids if self.guild.get_role(rid)]
-        
-        # Speichere Config in DB
-        await _save_config_to_db(self.guild.id, selected_role_ids, role_names)
+
+        # Speichere Config (config.db, wie der /setup-Assistent)
+        await settings.aupdate_config(self.guild.id, {"ticket_role_ids": selected_role_ids})
         
         # Aktualisiere das Embed
         embed = discord.Embed(
@@ -119,7 +98,8 @@ class CreateTicketButton(Button):
         super().__init__(
             style=discord.ButtonStyle.green,
             label="Create Ticket",
-            emoji="🎫"
+            emoji="🎫",
+            custom_id=CREATE_TICKET_ID
         )
         self.bot = bot
 
@@ -129,22 +109,26 @@ class CreateTicketButton(Button):
 
 
 class CloseTicketButton(Button):
-    """Button zum Schließen eines Tickets"""
-    def __init__(self, bot, guild_id: int, member_id: int):
+    """Button zum Schließen eines Tickets - das Ticket wird über den Channel aufgelöst"""
+    def __init__(self, bot):
         super().__init__(
             style=discord.ButtonStyle.red,
             label="Close Ticket",
-            emoji="🔒"
+            emoji="🔒",
+            custom_id=CLOSE_TICKET_ID
         )
         self.bot = bot
-        self.guild_id = guild_id
-        self.member_id = member_id
 
     async def callback(self, interaction: discord.Interaction):
         ticket_system = self.bot.get_cog('TicketSystem')
-        await ticket_system.close_ticket(interaction, self.guild_id, self.member_id)
+        owner = await ticket_system.get_ticket_by_channel(interaction.channel_id)
+        if owner is None:
+            await interaction.response.send_message("❌ Dieses Ticket existiert nicht mehr.", ephemeral=True)
+            return
+        await ticket_system.close_ticket(interaction, *owner)
 
 
+# Views sind persistent (timeout=None + feste custom_ids) und werden beim Start registriert
 class TicketView(View):
     """View mit Create-Ticket Button"""
     def __init__(self, bot):
@@ -154,9 +138,43 @@ class TicketView(View):
 
 class CloseTicketView(View):
     """View mit Close-Ticket Button"""
-    def __init__(self, bot, guild_id: int, member_id: int):
+    def __init__(self, bot):
         super().__init__(timeout=None)
-        self.add_item(CloseTicketButton(bot, guild_id, member_id))
+        self.add_item(CloseTicketButton(bot))
+
+
+class TicketProfile:
+    """
+    Aufgelöste Ticket-Einstellungen einer Guild: Kategorie, Overwrite-Vorlage (ohne den Ticket-Ersteller)
+    und die Supporter-Rollen als frozenset. Wird einmal gebaut und bei Config-, Rollen- oder Channel-Änderungen verworfen.
+    """
+
+    __slots__ = ("category", "overwrites", "role_ids")
+
+    def __init__(self, guild: discord.Guild, cfg: dict):
+        self.role_ids = frozenset(int(rid) for rid in cfg.get("ticket_role_ids") or [])
+
+        category = None
+        if cfg.get("ticket_category_id"):
+            category = guild.get_channel(int(cfg["ticket_category_id"]))
+        if not isinstance(category, discord.CategoryChannel):
+            category = discord.utils.get(guild.categories, name=TICKET_CATEGORY_NAME)
+        self.category = category
+
+        supporter = discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_messages=True)
+        self.overwrites = {
+            guild.default_role: discord.PermissionOverwrite(read_messages=False),
+            guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_channels=True),
+        }
+        for role_id in self.role_ids:
+            role = guild.get_role(role_id)
+            if role:
+                self.overwrites[role] = supporter
+
+    def overwrites_for(self, member: discord.Member) -> dict:
+        overwrites = dict(self.overwrites)
+        overwrites[member] = discord.PermissionOverwrite(read_messages=True, send_messages=True)
+        return overwrites
 
 
 class TicketSystem(ezcord.Cog, emoji="🎫"):
@@ -173,97 +191,243 @@ class TicketSystem(ezcord.Cog, emoji="🎫"):
     def __init__(self, bot):
         self.bot = bot
         self.db_path = DB_PATH
-        self._init_db()
-    
-    def _init_db(self):
-        """Initialisiert die Datenbank synchron."""
-        if not os.path.exists(DB_FOLDER):
-            os.makedirs(DB_FOLDER)
-        
-        import sqlite3
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS tickets
-            (
-                guild_id INTEGER NOT NULL,
-                user_id INTEGER NOT NULL,
-                channel_id INTEGER NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                PRIMARY KEY (guild_id, user_id)
-            )
-        ''')
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS ticket_config
-            (
-                guild_id INTEGER PRIMARY KEY,
-                allowed_roles TEXT NOT NULL,
-                role_names TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        # Offene Tickets im Speicher: (guild_id, user_id) -> channel_id und channel_id -> (guild_id, user_id)
+        self._tickets_by_user: dict[tuple[int, int], int] = {}
+        self._tickets_by_channel: dict[int, tuple[int, int]] = {}
+        self._tickets_loaded = False
+        self._load_lock = asyncio.Lock()
+        # Write-Behind: Änderungen werden in Reihenfolge von einem Writer-Task geschrieben
+        self._pending_writes: list[tuple[str, tuple]] = []
+        self._writer_task: asyncio.Task | None = None
+        self._writer_stopping = asyncio.Event()
+        self._views_registered = False
+        # Tickets, die gerade archiviert werden (Doppelklick auf "Close")
+        self._closing: set[int] = set()
+        # Ticket-Erstellung: laufende Anfragen pro (guild_id, user_id), Slots und Wartende pro Guild
+        self._creating: set[tuple[int, int]] = set()
+        self._create_slots: dict[int, asyncio.Semaphore] = {}
+        self._create_waiting: dict[int, int] = {}
+        # Vorberechnete Ticket-Profile pro Guild
+        self._profiles: dict[int, TicketProfile] = {}
+        self._category_lock = asyncio.Lock()
+        settings.add_config_listener(self._on_config_update)
+
+    def cog_unload(self):
+        settings.remove_config_listener(self._on_config_update)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        if not self._views_registered:
+            # Buttons in bestehenden Nachrichten reagieren auch nach einem Neustart
+            self.bot.add_view(TicketView(self.bot))
+            self.bot.add_view(CloseTicketView(self.bot))
+            self._views_registered = True
+        await self._ensure_tickets_loaded()
+        await self._reconcile_tickets()
+        await self._import_legacy_ticket_config()
+
+    async def _import_legacy_ticket_config(self):
+        """Übernimmt alte Rollen aus tickets.db/ticket_config einmalig nach config.db (ticket_role_ids)"""
+        try:
+            db = await database.get(self.db_path)
+            rows = await db.fetchall("SELECT guild_id, allowed_roles FROM ticket_config")
+            if not rows:
+                return
+            for guild_id, allowed_roles in rows:
+                cfg = await settings.aget_config(guild_id)
+                if not cfg.get("ticket_role_ids"):
+                    await settings.aupdate_config(guild_id, {"ticket_role_ids": json.loads(allowed_roles)})
+            await db.execute("DELETE FROM ticket_config")
+            logger.info(f"Ticket-Rollen von {len(rows)} Guilds nach config.db übernommen")
+        except Exception as e:
+            logger.error(f"Fehler beim Übernehmen der alten Ticket-Config: {e}")
+
+    async def _reconcile_tickets(self):
+        """Entfernt alle Tickets, deren Channel während der Offline-Zeit gelöscht wurde (ein DELETE)"""
+        orphans = []
+        for (guild_id, user_id), channel_id in self._tickets_by_user.items():
+            guild = self.bot.get_guild(guild_id)
+            # Guilds außerhalb des Caches nicht anfassen - dort ist der Channel-Stand unbekannt
+            if guild is not None and guild.get_channel(channel_id) is None:
+                orphans.append((guild_id, user_id, channel_id))
+        if not orphans:
+            return
+        for guild_id, user_id, channel_id in orphans:
+            del self._tickets_by_user[(guild_id, user_id)]
+            self._tickets_by_channel.pop(channel_id, None)
+        try:
+            db = await database.get(self.db_path)
+            await db.execute(
+                "DELETE FROM tickets WHERE channel_id IN (SELECT value FROM json_each(?))",
+                (json.dumps([channel_id for _, _, channel_id in orphans]),)
             )
-        ''')
-        conn.commit()
-        conn.close()
-        logger.info("Ticket-Datenbank initialisiert")
+            logger.info(f"{len(orphans)} verwaiste Tickets entfernt")
+        except Exception as e:
+            logger.error(f"Fehler beim Entfernen verwaister Tickets: {e}")
+
+    async def cog_shutdown(self):
+        """Ausstehende Ticket-Änderungen beim Beenden schreiben"""
+        # Writer nicht abbrechen (das Batch könnte halb geschrieben sein), nur das Warten auf einen Retry beenden
+        self._writer_stopping.set()
+        if self._writer_task is not None and not self._writer_task.done():
+            await self._writer_task
+        await self._write_pending()
+
+    async def _ensure_tickets_loaded(self):
+        if self._tickets_loaded:
+            return
+        async with self._load_lock:
+            if self._tickets_loaded:
+                return
+            db = await database.get(self.db_path)
+            rows = await db.fetchall("SELECT guild_id, user_id, channel_id FROM tickets")
+            for guild_id, user_id, channel_id in rows:
+                self._tickets_by_user[(guild_id, user_id)] = channel_id
+                self._tickets_by_channel[channel_id] = (guild_id, user_id)
+            self._tickets_loaded = True
+            logger.info(f"{len(rows)} offene Tickets geladen")
+
+    def _persist(self, sql: str, params: tuple):
+        self._pending_writes.append((sql, params))
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._write_pending())
+
+    async def _write_pending(self):
+        delay = TICKET_WRITE_RETRY_DELAY
+        while self._pending_writes:
+            batch, self._pending_writes = self._pending_writes, []
+            try:
+                db = await database.get(self.db_path)
+                async with db.transaction() as conn:
+                    for sql, params in batch:
+                        await conn.execute(sql, params)
+            except BaseException as e:
+                # Batch vorne wieder einreihen - die Reihenfolge der Änderungen bleibt erhalten
+                self._pending_writes = batch + self._pending_writes
+                if not isinstance(e, Exception):
+                    raise
+                if self._writer_stopping.is_set():
+                    logger.error(f"Fehler beim Schreiben der Tickets, {len(self._pending_writes)} Änderungen gehen verloren: {e}")
+                    return
+                logger.error(f"Fehler beim Schreiben der Tickets, neuer Versuch in {delay}s: {e}")
+                try:
+                    await asyncio.wait_for(self._writer_stopping.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                delay = min(delay * 2, TICKET_WRITE_RETRY_MAX_DELAY)
+            else:
+                delay = TICKET_WRITE_RETRY_DELAY
 
     async def add_ticket(self, guild_id: int, user_id: int, channel_id: int):
-        """Speichert ein neues Ticket in der Datenbank."""
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute('''
-                    INSERT OR REPLACE INTO tickets (guild_id, user_id, channel_id)
-                    VALUES (?, ?, ?)
-                ''', (guild_id, user_id, channel_id))
-                await db.commit()
-                logger.info(f"Ticket erstellt: Guild {guild_id}, User {user_id}, Channel {channel_id}")
-        except Exception as e:
-            logger.error(f"Fehler beim Speichern des Tickets: {e}")
+        """Speichert ein neues Ticket (sofort im Speicher, Datenbank im Hintergrund)."""
+        await self._ensure_tickets_loaded()
+        old_channel_id = self._tickets_by_user.get((guild_id, user_id))
+        if old_channel_id is not None:
+            self._tickets_by_channel.pop(old_channel_id, None)
+        self._tickets_by_user[(guild_id, user_id)] = channel_id
+        self._tickets_by_channel[channel_id] = (guild_id, user_id)
+        self._persist('''
+            INSERT OR REPLACE INTO tickets (guild_id, user_id, channel_id)
+            VALUES (?, ?, ?)
+        ''', (guild_id, user_id, channel_id))
+        logger.info(f"Ticket erstellt: Guild {guild_id}, User {user_id}, Channel {channel_id}")
 
     async def remove_ticket(self, guild_id: int, user_id: int):
-        """Löscht ein Ticket aus der Datenbank."""
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute('''
-                    DELETE FROM tickets WHERE guild_id = ? AND user_id = ?
-                ''', (guild_id, user_id))
-                await db.commit()
-                logger.info(f"Ticket gelöscht: Guild {guild_id}, User {user_id}")
-        except Exception as e:
-            logger.error(f"Fehler beim Löschen des Tickets: {e}")
+        """Löscht ein Ticket (sofort im Speicher, Datenbank im Hintergrund)."""
+        await self._ensure_tickets_loaded()
+        channel_id = self._tickets_by_user.pop((guild_id, user_id), None)
+        if channel_id is None:
+            return
+        self._tickets_by_channel.pop(channel_id, None)
+        self._persist('''
+            DELETE FROM tickets WHERE guild_id = ? AND user_id = ?
+        ''', (guild_id, user_id))
+        logger.info(f"Ticket gelöscht: Guild {guild_id}, User {user_id}")
 
     async def get_ticket(self, guild_id: int, user_id: int) -> int | None:
-        """Ruft die Channel-ID eines Tickets ab."""
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute('''
-                    SELECT channel_id FROM tickets WHERE guild_id = ? AND user_id = ?
-                ''', (guild_id, user_id)) as cursor:
-                    result = await cursor.fetchone()
-                    return result[0] if result else None
-        except Exception as e:
-            logger.error(f"Fehler beim Abrufen des Tickets: {e}")
-            return None
-
-    def _get_allowed_roles(self, guild_id: int) -> list:
-        """Hole die erlaubten Rollen für einen Server aus der SQL-Konfiguration"""
-        try:
-            cfg = settings.get_config(guild_id)
-            role_ids = cfg.get("ticket_role_ids", [])
-            return [int(rid) if isinstance(rid, str) else rid for rid in role_ids]
-        except Exception as e:
-            logger.error(f"Fehler beim Abrufen der Ticket-Rollen: {e}")
-            return []
+        """Ruft die Channel-ID eines Tickets ab (aus dem Speicher)."""
+        await self._ensure_tickets_loaded()
+        return self._tickets_by_user.get((guild_id, user_id))
+
+    async def get_ticket_by_channel(self, channel_id: int) -> tuple[int, int] | None:
+        """(guild_id, user_id) des Tickets in einem Channel"""
+        await self._ensure_tickets_loaded()
+        return self._tickets_by_channel.get(channel_id)
+
+    async def _archive_ticket(self, channel: discord.TextChannel, guild_id: int, user_id: int, closed_by: int):
+        """Schreibt das Transkript und trägt es in die transcripts-Tabelle ein (für das Dashboard)"""
+        transcript = await archive_channel(channel)
+        db = await database.get(self.db_path)
+        await db.execute('''
+            INSERT INTO transcripts (guild_id, user_id, channel_id, channel_name, closed_by, path, message_count, attachment_count)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            guild_id, user_id, channel.id, channel.name, closed_by,
+            transcript.path, transcript.message_count, transcript.attachment_count
+        ))
+        logger.info(f"Transkript gespeichert: {transcript.path} ({transcript.message_count} Nachrichten)")
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        if isinstance(channel, discord.CategoryChannel):
+            self.invalidate_profile(channel.guild.id)
+        # Manuell gelöschte Ticket-Channels sofort austragen
+        owner = self._tickets_by_channel.get(channel.id)
+        if owner is not None:
+            await self.remove_ticket(*owner)
+
+    async def get_profile(self, guild: discord.Guild) -> TicketProfile:
+        """Ticket-Profil einer Guild (einmal gebaut, danach aus dem Speicher)"""
+        profile = self._profiles.get(guild.id)
+        if profile is None:
+            cfg = await settings.aget_config(guild.id)
+            profile = self._profiles[guild.id] = TicketProfile(guild, cfg)
+        return profile
+
+    def invalidate_profile(self, guild_id: int):
+        self._profiles.pop(guild_id, None)
+
+    def _on_config_update(self, guild_id: int, keys: set):
+        if keys & TICKET_CONFIG_KEYS:
+            self.invalidate_profile(guild_id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: discord.Role):
+        profile = self._profiles.get(role.guild.id)
+        if profile is not None and role.id in profile.role_ids:
+            self.invalidate_profile(role.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        profile = self._profiles.get(after.guild.id)
+        if profile is not None and after.id in profile.role_ids:
+            self.invalidate_profile(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        # Eine neue Kategorie kann die Fallback-Kategorie (nach Name) sein
+        if isinstance(channel, discord.CategoryChannel):
+            self.invalidate_profile(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if isinstance(after, discord.CategoryChannel):
+            self.invalidate_profile(after.guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.invalidate_profile(guild.id)
 
     async def user_can_manage_tickets(self, member: discord.Member) -> bool:
         """Prüfe ob ein User Tickets bearbeiten darf"""
         if member.guild_permissions.administrator:
             return True
-        
-        allowed_role_ids = self._get_allowed_roles(member.guild.id)
-        if not allowed_role_ids:
+
+        profile = await self.get_profile(member.guild)
+        if not profile.role_ids:
             return member.guild_permissions.manage_messages
-        
-        return any(role.id in allowed_role_ids for role in member.roles)
+
+        return any(role.id in profile.role_ids for role in member.roles)
 
     # Hinweis: Setup-Befehle wurden entfernt und durch den zentralen `/setup`-Assistent ersetzt.
     # Ticket-Button kann über den Setup-Assistenten gepostet werden.
@@ -278,6 +442,43 @@ class TicketSystem(ezcord.Cog, emoji="🎫"):
         # Bestätige die Interaction sofort (SEHR WICHTIG!)
         await interaction.response.defer(ephemeral=True)
 
+        # Doppelklick: läuft für diesen User schon eine Erstellung, sofort ablehnen
+        key = (guild.id, member.id)
+        if key in self._creating:
+            await interaction.followup.send("⏳ Dein Ticket wird bereits erstellt.", ephemeral=True)
+            return
+        depth = self._create_waiting.get(guild.id, 0)
+        if depth >= TICKET_CREATE_QUEUE_MAX:
+            await interaction.followup.send(
+                "❌ Gerade werden zu viele Tickets erstellt. Bitte versuche es gleich noch einmal.",
+                ephemeral=True
+            )
+            return
+
+        slots = self._create_slots.get(guild.id)
+        if slots is None:
+            slots = self._create_slots[guild.id] = asyncio.Semaphore(TICKET_CREATE_CONCURRENCY)
+        self._creating.add(key)
+        self._create_waiting[guild.id] = depth + 1
+        start = time.monotonic()
+        waiting = True
+        try:
+            async with slots:
+                waiting = False
+                self._create_waiting[guild.id] -= 1
+                await self._create_ticket(interaction, depth, time.monotonic() - start)
+        finally:
+            self._creating.discard(key)
+            if waiting:
+                self._create_waiting[guild.id] -= 1
+            if not self._create_waiting.get(guild.id):
+                self._create_waiting.pop(guild.id, None)
+
+    async def _create_ticket(self, interaction: discord.Interaction, queue_depth: int, waited: float):
+        """Die eigentliche Erstellung - läuft in einem der Slots der Guild"""
+        guild = interaction.guild
+        member = interaction.user
+
         try:
             # Prüfe ob User bereits ein Ticket hat
             existing_channel_id = await self.get_ticket(guild.id, member.id)
@@ -292,53 +493,34 @@ class TicketSystem(ezcord.Cog, emoji="🎫"):
                 else:
                     await self.remove_ticket(guild.id, member.id)
 
-            # Hole Ticket-Kategorie oder erstelle sie
-            cfg = settings.get_config(guild.id)
-            category_id = cfg.get("ticket_category_id")
-            category = None
-            
-            if category_id:
-                category = guild.get_channel(int(category_id))
-            
-            if not category:
-                # Fallback: Suche "🎫 Support Tickets" oder erstelle sie
-                category = discord.utils.get(guild.categories, name="🎫 Support Tickets")
-                if not category:
-                    try:
-                        category = await guild.create_category("🎫 Support Tickets")
-                    except Exception as e:
-                        logger.error(f"Fehler beim Erstellen der Ticket-Kategorie: {e}")
-                        await interaction.followup.send(
-                            "❌ Konnte Ticket-Kategorie nicht erstellen. Bitte Admin kontaktieren.",
-                            ephemeral=True
-                        )
-                        return
-
-            # Hole erlaubte Rollen
-            allowed_role_ids = self._get_allowed_roles(guild.id)
-            if not allowed_role_ids:
+            # Vorberechnetes Profil: Rollen, Kategorie und Overwrite-Vorlage
+            profile = await self.get_profile(guild)
+            if not profile.role_ids:
                 await interaction.followup.send(
                     "❌ Keine Ticket-Rollen konfiguriert. Bitte Admin kontaktieren.",
                     ephemeral=True
                 )
                 return
-            
-            # Erstelle Channel mit Permissions
-            overwrites = {
-                guild.default_role: discord.PermissionOverwrite(read_messages=False),
-                member: discord.PermissionOverwrite(read_messages=True, send_messages=True),
-                guild.me: discord.PermissionOverwrite(read_messages=True, send_messages=True, manage_channels=True)
-            }
-            
-            # Füge Supporter-Rollen hinzu
-            for role_id in allowed_role_ids:
-                role = guild.get_role(role_id)
-                if role:
-                    overwrites[role] = discord.PermissionOverwrite(
-                        read_messages=True,
-                        send_messages=True,
-                        manage_messages=True
+
+            category = profile.category
+            if category is None:
+                # Fallback-Kategorie existiert nicht -> erstellen (nur einmal, auch bei parallelen Tickets)
+                try:
+                    async with self._category_lock:
+                        category = discord.utils.get(guild.categories, name=TICKET_CATEGORY_NAME)
+                        if category is None:
+                            category = await guild.create_category(TICKET_CATEGORY_NAME)
+                    profile.category = category
+                except Exception as e:
+                    logger.error(f"Fehler beim Erstellen der Ticket-Kategorie: {e}")
+                    await interaction.followup.send(
+                        "❌ Konnte Ticket-Kategorie nicht erstellen. Bitte Admin kontaktieren.",
+                        ephemeral=True
                     )
+                    return
+
+            # Erstelle Channel mit Permissions
+            overwrites = profile.overwrites_for(member)
 
             channel = await guild.create_text_channel(
                 f"ticket-{member.name}",
@@ -362,14 +544,14 @@ class TicketSystem(ezcord.Cog, emoji="🎫"):
                 inline=False
             )
             
-            view = CloseTicketView(self.bot, guild.id, member.id)
+            view = CloseTicketView(self.bot)
             await channel.send(embed=embed, view=view)
             
-            # Benachrichtige den User
-            await interaction.followup.send(
-                f"✅ Dein Ticket wurde erstellt: {channel.mention}",
-                ephemeral=True
-            )
+            # Benachrichtige den User (inkl. Warteschlange, falls er warten musste)
+            message = f"✅ Dein Ticket wurde erstellt: {channel.mention}"
+            if queue_depth or waited >= 1:
+                message += f"\n-# Warteschlange: {queue_depth} vor dir · Wartezeit {waited:.1f}s"
+            await interaction.followup.send(message, ephemeral=True)
             logger.info(f"Ticket erstellt für {member.name} ({member.id}) auf {guild.name}")
 
         except Exception as e:
@@ -381,7 +563,7 @@ class TicketSystem(ezcord.Cog, emoji="🎫"):
 
     async def close_ticket(self, interaction: discord.Interaction, guild_id: int, member_id: int):
         """
-        Schließt ein Ticket-Kanal und löscht ihn nach 2 Sekunden.
+        Schließt ein Ticket: Verlauf archivieren, danach den Kanal löschen.
         WICHTIG: Interaction wird sofort bestätigt!
         """
         try:
@@ -402,64 +584,81 @@ class TicketSystem(ezcord.Cog, emoji="🎫"):
                     pass
                 return
 
-            channel = interaction.guild.get_channel(channel_id)
+            if channel_id in self._closing:
+                await interaction.followup.send("⏳ Dieses Ticket wird bereits geschlossen.", ephemeral=True)
+                return
+            self._closing.add(channel_id)
+            try:
+                await self._close_ticket_channel(interaction, channel_id, guild_id, member_id)
+            finally:
+                self._closing.discard(channel_id)
 
-            # Sende Bestätigung ZUERST (bevor Channel gelöscht wird)
+        except Exception as e:
+            logger.error(f"Fehler beim Schließen des Tickets: {e}")
             try:
                 await interaction.followup.send(
-                    "✅ Ticket wird geschlossen und gelöscht.",
+                    f"❌ Fehler beim Schließen: {e}",
                     ephemeral=True
                 )
+            except:
+                pass  # Kann nicht mehr senden
+
+    async def _close_ticket_channel(self, interaction: discord.Interaction, channel_id: int, guild_id: int, member_id: int):
+        """Bestätigen, archivieren, Kanal löschen, Ticket austragen, User benachrichtigen"""
+        channel = interaction.guild.get_channel(channel_id)
+
+        # Sende Bestätigung ZUERST (bevor Channel gelöscht wird)
+        try:
+            await interaction.followup.send(
+                "✅ Ticket wird geschlossen und gelöscht.",
+                ephemeral=True
+            )
+        except Exception as e:
+            logger.warning(f"Konnte Bestätigung nicht senden: {e}")
+
+        # DANN mache lange Operationen
+        if channel:
+            # Sende Schließungs-Nachricht
+            close_embed = discord.Embed(
+                title="🔒 Ticket wird geschlossen",
+                description="Der Verlauf wird archiviert, danach wird dieser Kanal gelöscht.",
+                color=discord.Color.red()
+            )
+            try:
+                await channel.send(embed=close_embed)
             except Exception as e:
-                logger.warning(f"Konnte Bestätigung nicht senden: {e}")
-
-            # DANN mache lange Operationen
-            if channel:
-                # Sende Schließungs-Nachricht
-                close_embed = discord.Embed(
-                    title="🔒 Ticket wird geschlossen",
-                    description="Dieser Kanal wird in 2 Sekunden gelöscht.",
-                    color=discord.Color.red()
-                )
-                try:
-                    await channel.send(embed=close_embed)
-                except Exception as e:
-                    logger.warning(f"Konnte Schließungs-Nachricht nicht senden: {e}")
-                
-                await asyncio.sleep(2)
-                
-                # Lösche Kanal
-                try:
-                    await channel.delete()
-                except Exception as e:
-                    logger.warning(f"Konnte Channel nicht löschen: {e}")
+                logger.warning(f"Konnte Schließungs-Nachricht nicht senden: {e}")
 
-            # Lösche aus DB
-            await self.remove_ticket(guild_id, member_id)
+            # Kanal erst löschen, wenn das Transkript vollständig geschrieben ist
+            try:
+                await self._archive_ticket(channel, guild_id, member_id, interaction.user.id)
+            except Exception as e:
+                logger.error(f"Transkript für Ticket {channel_id} fehlgeschlagen: {e}")
+                await channel.send("❌ Der Verlauf konnte nicht archiviert werden - der Kanal bleibt bestehen.")
+                return
 
-            # Benachrichtige User per DM
+            # Lösche Kanal
             try:
-                user = await self.bot.fetch_user(member_id)
-                dm_embed = discord.Embed(
-                    title="✅ Ticket geschlossen",
-                    description=f"Dein Support-Ticket auf {interaction.guild.name} wurde geschlossen.",
-                    color=discord.Color.green()
-                )
-                await user.send(embed=dm_embed)
+                await channel.delete()
             except Exception as e:
-                logger.warning(f"Konnte DM nicht senden an User {member_id}: {e}")
+                logger.warning(f"Konnte Channel nicht löschen: {e}")
 
-            logger.info(f"Ticket geschlossen von {interaction.user.name}")
+        # Lösche aus DB
+        await self.remove_ticket(guild_id, member_id)
 
+        # Benachrichtige User per DM
+        try:
+            user = await self.bot.fetch_user(member_id)
+            dm_embed = discord.Embed(
+                title="✅ Ticket geschlossen",
+                description=f"Dein Support-Ticket auf {interaction.guild.name} wurde geschlossen.",
+                color=discord.Color.green()
+            )
+            await user.send(embed=dm_embed)
         except Exception as e:
-            logger.error(f"Fehler beim Schließen des Tickets: {e}")
-            try:
-                await interaction.followup.send(
-                    f"❌ Fehler beim Schließen: {e}",
-                    ephemeral=True
-                )
-            except:
-                pass  # Kann nicht mehr senden
+            logger.warning(f"Konnte DM nicht senden an User {member_id}: {e}")
+
+        logger.info(f"Ticket geschlossen von {interaction.user.name}")
 
 
 def setup(bot):
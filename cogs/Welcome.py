@@ -2,21 +2,201 @@ import discord
 from discord.ext import commands
 from discord import File
 from discord.utils import get
-from easy_pil import Editor, load_image_async, Font
 import ezcord
+import asyncio
+import io
+import logging
 import os
+import time
+from bisect import bisect_left, insort
+from collections import deque
+from source.avatars import avatars
+from source.cards import render, render_welcome_card
 from source.paths import get_welcome_image_path
 
+logger = logging.getLogger('discord_bot')
+
+WELCOME_INFO_CHANNEL_ID = 885152158599770183
+
+# Mehr als WELCOME_BURST_JOINS Joins innerhalb von WELCOME_BURST_WINDOW Sekunden -> Sammel-Begrüßung
+WELCOME_BURST_JOINS = 5
+WELCOME_BURST_WINDOW = 10
+# Maximal so viele ausstehende Nachrichten pro Guild, danach wird verworfen
+WELCOME_QUEUE_MAX = 20
+MESSAGE_LIMIT = 2000
+
+
+class JoinIndex:
+    """
+    Sortierte Beitrittszeiten einer Guild als (timestamp, member_id).
+    Die Position eines Members (wie viele sind vor ihm beigetreten) ergibt sich per bisect in O(log n).
+    """
+
+    __slots__ = ("entries", "members")
+
+    def __init__(self, members):
+        self.members = {m.id: m.joined_at.timestamp() for m in members if m.joined_at is not None}
+        self.entries = sorted((ts, member_id) for member_id, ts in self.members.items())
+
+    def add(self, member: discord.Member):
+        if member.joined_at is None or member.id in self.members:
+            return
+        ts = member.joined_at.timestamp()
+        self.members[member.id] = ts
+        insort(self.entries, (ts, member.id))
+
+    def remove(self, member_id: int):
+        ts = self.members.pop(member_id, None)
+        if ts is None:
+            return
+        idx = bisect_left(self.entries, (ts, member_id))
+        if idx < len(self.entries) and self.entries[idx] == (ts, member_id):
+            del self.entries[idx]
+
+    def position(self, member: discord.Member) -> int:
+        """Anzahl der Member, die echt früher beigetreten sind"""
+        if member.joined_at is None:
+            return len(self.entries)
+        # (ts,) ist kleiner als jedes (ts, id) -> zählt nur echt frühere Zeitpunkte
+        return bisect_left(self.entries, (member.joined_at.timestamp(),))
+
+
+class WelcomeOutbox:
+    """Sendet die Begrüßungen einer Guild nacheinander über eine begrenzte Queue"""
+
+    __slots__ = ("queue", "task")
+
+    def __init__(self, maxsize: int = WELCOME_QUEUE_MAX):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self.task: asyncio.Task | None = None
+
+    def submit(self, job) -> bool:
+        """job = Coroutine-Funktion ohne Argumente; False, wenn die Queue voll ist"""
+        try:
+            self.queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return False
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run())
+        return True
+
+    async def _run(self):
+        # Endet, sobald die Queue leer ist - submit() startet bei Bedarf einen neuen Worker
+        while not self.queue.empty():
+            job = self.queue.get_nowait()
+            try:
+                await job()
+            except Exception as e:
+                logger.warning(f"Begrüßung konnte nicht gesendet werden: {e}")
+
+    def cancel(self):
+        if self.task is not None:
+            self.task.cancel()
+
 
 class Welcome(ezcord.Cog, emoji="👋", description="Welcome System - Begrüße neue Member"):
-    
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._join_index: dict[int, JoinIndex] = {}
+        self._outboxes: dict[int, WelcomeOutbox] = {}
+        self._recent_joins: dict[int, deque] = {}
+        self._burst_members: dict[int, list[discord.Member]] = {}
+        self._burst_tasks: dict[int, asyncio.Task] = {}
+
+    def cog_unload(self):
+        for outbox in self._outboxes.values():
+            outbox.cancel()
+        for task in self._burst_tasks.values():
+            task.cancel()
+
+    def _index_for(self, guild: discord.Guild) -> JoinIndex:
+        """Baut den Index beim ersten Zugriff einmalig aus dem Member-Cache"""
+        index = self._join_index.get(guild.id)
+        if index is None:
+            index = self._join_index[guild.id] = JoinIndex(guild.members)
+        return index
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        index = self._join_index.get(member.guild.id)
+        if index is not None:
+            index.remove(member.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        self._join_index.pop(guild.id, None)
+        self._recent_joins.pop(guild.id, None)
+        self._burst_members.pop(guild.id, None)
+        outbox = self._outboxes.pop(guild.id, None)
+        if outbox is not None:
+            outbox.cancel()
+        task = self._burst_tasks.pop(guild.id, None)
+        if task is not None:
+            task.cancel()
+
+    def _submit(self, guild: discord.Guild, job):
+        outbox = self._outboxes.get(guild.id)
+        if outbox is None:
+            outbox = self._outboxes[guild.id] = WelcomeOutbox()
+        if not outbox.submit(job):
+            logger.warning(f"Welcome-Queue für {guild.id} ist voll - Begrüßung verworfen")
+
+    def _is_burst(self, guild_id: int, now: float) -> bool:
+        joins = self._recent_joins.get(guild_id)
+        if joins is None:
+            joins = self._recent_joins[guild_id] = deque()
+        joins.append(now)
+        while joins and joins[0] < now - WELCOME_BURST_WINDOW:
+            joins.popleft()
+        return len(joins) > WELCOME_BURST_JOINS
+
+    def _add_to_burst(self, member: discord.Member):
+        guild = member.guild
+        self._burst_members.setdefault(guild.id, []).append(member)
+        task = self._burst_tasks.get(guild.id)
+        if task is None or task.done():
+            self._burst_tasks[guild.id] = asyncio.create_task(self._flush_burst(guild))
+
+    async def _flush_burst(self, guild: discord.Guild):
+        """Sammelt Joins eines Zeitfensters und begrüßt sie mit einer Nachricht (nur Text)"""
+        await asyncio.sleep(WELCOME_BURST_WINDOW)
+        members = self._burst_members.pop(guild.id, [])
+        channel = guild.system_channel
+        if not members or channel is None:
+            return
+
+        header = f"Welcome To **{guild.name}**, {len(members)} neue Member! For More Information Go To <#{WELCOME_INFO_CHANNEL_ID}>.\n"
+        messages = []
+        current = header
+        for member in members:
+            mention = f"{member.mention} "
+            if len(current) + len(mention) > MESSAGE_LIMIT:
+                messages.append(current)
+                current = ""
+            current += mention
+        messages.append(current)
+
+        for content in messages:
+            self._submit(guild, lambda content=content: channel.send(content))
+
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
+        index = self._index_for(member.guild)
+        index.add(member)
+        pos = index.position(member)
+
+        if member.guild.system_channel is None:
+            return
+        if self._is_burst(member.guild.id, time.monotonic()):
+            self._add_to_burst(member)
+            return
+        self._submit(member.guild, lambda: self._send_welcome(member, pos))
+
+    async def _send_welcome(self, member: discord.Member, pos: int):
         channel = member.guild.system_channel
         image_path = get_welcome_image_path()
 
-        pos = sum(m.joined_at < member.joined_at for m in member.guild.members if m.joined_at is not None)
-
         if pos == 1:
             te = "st"
         elif pos == 2:
@@ -26,29 +206,17 @@ class Welcome(ezcord.Cog, emoji="👋", description="Welcome System - Begrüße
         else:
             te = "th"
 
-        background = Editor(image_path)
-        profile_image = await load_image_async(str(member.display_avatar.url))
-
-        profile = Editor(profile_image).resize((150, 150)).circle_image()
-        poppins = Font.poppins(size=40, variant="bold")
-
-        poppins_small = Font.poppins(size=25, variant="light")
-
-        background.paste(profile, (325, 90))
-        background.ellipse((325, 90), 150, 150, outline="gold", stroke_width=4)
-
-        background.text((400, 260), f"WELCOME TO {member.guild.name}", color="white", font=poppins, align="center")
-        background.text((400, 325), f"{member.display_name}", color="red", font=poppins_small,
-                        align="center")
-        background.text((400, 360), f"You Are The {pos}{te} Member", color="red", font=poppins_small,
-                        align="center")
-
-        file = File(fp=background.image_bytes, filename=image_path)
+        avatar_bytes = await avatars.fetch(member.display_avatar)
+        card = await render(
+            render_welcome_card, image_path, member.guild.name, avatar_bytes, member.display_name, f"{pos}{te}"
+        )
+        file = File(fp=io.BytesIO(card), filename="welcome.png")
 
+        # Text und Bild in einer Nachricht - halbiert die Requests pro Join
         await channel.send(
-            f"Heya {member.mention}! Welcome To **{member.guild.name}**. For More Information Go To <#885152158599770183>.")
-        await channel.send(file=file)
-
+            f"Heya {member.mention}! Welcome To **{member.guild.name}**. For More Information Go To <#{WELCOME_INFO_CHANNEL_ID}>.",
+            file=file,
+        )
 
 def setup(bot):
     bot.add_cog(Welcome(bot))
\ No newline at end of file
@@ -0,0 +1,270 @@
+"""
+Offline-Werkzeug für level.db - läuft ohne den Bot.
+
+    python level_tool.py export --format csv -o levels.csv [--guild ID]
+    python level_tool.py import levels.jsonl [--guild ID] [--mode replace|add]
+    python level_tool.py recalc [--guild ID] [--xp-factor 1.5] [-o report.csv]
+
+Der Bot sollte währenddessen gestoppt sein: LevelSystem hält XP im Speicher
+und würde importierte Werte sonst mit seinem Cache überlagern.
+"""
+
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from bisect import bisect_right
+from collections import Counter
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from source.levels import levels_for
+from source.migrations import LEVEL_MIGRATIONS, apply_migrations
+from source.paths import get_config_db_path, get_level_db_path
+
+
+FIELDS = ("guild_id", "user_id", "xp", "msg_count")
+CHUNK_SIZE = 50_000
+DEFAULT_LEVEL_MILESTONES = [2, 5, 10, 20]  # wie in cogs/LevelSystem.py
+# Ranglisten-Index wie in source/migrations.py - wird bei großen Importen einmal am Ende neu aufgebaut
+USERS_XP_INDEX = "idx_users_guild_xp"
+USERS_XP_INDEX_SQL = f"CREATE INDEX IF NOT EXISTS {USERS_XP_INDEX} ON users (guild_id, xp DESC, user_id)"
+
+Row = Tuple[int, int, int, int]
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    # apply_migrations statt migrate(), damit auch Kopien unter anderem Pfad funktionieren
+    apply_migrations(db_path, LEVEL_MIGRATIONS)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[list]:
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def _select_users(conn: sqlite3.Connection, guild_id: Optional[int]) -> sqlite3.Cursor:
+    if guild_id is None:
+        return conn.execute("SELECT guild_id, user_id, xp, msg_count FROM users")
+    return conn.execute(
+        "SELECT guild_id, user_id, xp, msg_count FROM users WHERE guild_id = ?", (guild_id,)
+    )
+
+
+# --- Export ---
+def export_rows(conn: sqlite3.Connection, out, fmt: str, guild_id: Optional[int]) -> int:
+    """Streamt alle Zeilen blockweise, ohne die Tabelle in den Speicher zu laden"""
+    cursor = _select_users(conn, guild_id)
+    writer = csv.writer(out) if fmt == "csv" else None
+    if writer:
+        writer.writerow(FIELDS)
+    count = 0
+    while rows := cursor.fetchmany(CHUNK_SIZE):
+        if writer:
+            writer.writerows(rows)
+        else:
+            # Alle Felder sind Integer - direktes Formatieren ist deutlich schneller als json.dumps
+            out.writelines(
+                f'{{"guild_id": {g}, "user_id": {u}, "xp": {x}, "msg_count": {m}}}\n' for g, u, x, m in rows
+            )
+        count += len(rows)
+    return count
+
+
+# --- Import ---
+def _jsonl_records(f) -> Iterator[dict]:
+    # Ein json.loads pro Block statt pro Zeile - halbiert die Parse-Zeit
+    for lines in _chunks(f, CHUNK_SIZE):
+        yield from json.loads("[" + ",".join(line for line in lines if line.strip()) + "]")
+
+
+def _parse_rows(path: str, fmt: str, default_guild: Optional[int]) -> Iterator[Row]:
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            reader = csv.reader(f)
+            header = next(reader, [])
+            records = (dict(zip(header, values)) for values in reader)
+        else:
+            records = _jsonl_records(f)
+        for record in records:
+            guild_id = record.get("guild_id")
+            # 0 ist eine gültige Guild-ID (alte, globale XP)
+            if guild_id in (None, ""):
+                guild_id = default_guild
+            if guild_id is None:
+                raise ValueError("Zeile ohne guild_id - bitte --guild angeben")
+            yield (
+                int(guild_id),
+                int(record["user_id"]),
+                int(record.get("xp") or 0),
+                int(record.get("msg_count") or 0),
+            )
+
+
+def import_rows(conn: sqlite3.Connection, rows: Iterable[Row], mode: str) -> int:
+    """
+    Lädt die Zeilen blockweise (executemany) in eine Staging-Tabelle ohne Index und
+    übernimmt sie dann mit einem sortierten UPSERT in einer Transaktion.
+    Bei großen Importen wird der Ranglisten-Index danach einmal neu aufgebaut,
+    statt ihn für jede Zeile einzeln zu pflegen.
+    """
+    if mode == "replace":
+        update = "xp = excluded.xp, msg_count = excluded.msg_count"
+    else:
+        update = "xp = xp + excluded.xp, msg_count = msg_count + excluded.msg_count"
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS import_users "
+        "(guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, xp INTEGER NOT NULL, msg_count INTEGER NOT NULL)"
+    )
+    conn.execute("DELETE FROM import_users")
+    count = 0
+    conn.execute("BEGIN")
+    try:
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            conn.executemany("INSERT INTO import_users VALUES (?, ?, ?, ?)", chunk)
+            count += len(chunk)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+    rebuild_index = count >= CHUNK_SIZE
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if rebuild_index:
+            conn.execute(f"DROP INDEX IF EXISTS {USERS_XP_INDEX}")
+        # Sortiert nach Primärschlüssel, bei doppelten Zeilen gewinnt (replace) die letzte der Datei
+        conn.execute(f"""
+            INSERT INTO users (guild_id, user_id, xp, msg_count)
+            SELECT guild_id, user_id, xp, msg_count FROM import_users WHERE true ORDER BY guild_id, user_id, rowid
+            ON CONFLICT(guild_id, user_id) DO UPDATE SET {update}
+        """)
+        if rebuild_index:
+            conn.execute(USERS_XP_INDEX_SQL)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.execute("DELETE FROM import_users")
+    return count
+
+
+# --- Neuberechnung ---
+def _milestones_by_guild() -> dict:
+    """Sortierte Meilenstein-Level pro Guild aus config.db (level_role_ids)"""
+    try:
+        # Nur lesen - eine fehlende config.db soll nicht leer angelegt werden
+        conn = sqlite3.connect(f"file:{get_config_db_path()}?mode=ro", uri=True)
+    except sqlite3.OperationalError:
+        return {}
+    try:
+        result = {}
+        for guild_id, raw in conn.execute(
+            "SELECT guild_id, level_role_ids FROM guild_config WHERE level_role_ids IS NOT NULL"
+        ):
+            levels = sorted(int(level) for level, role_id in json.loads(raw).items() if role_id)
+            if levels:
+                result[int(guild_id)] = levels
+        return result
+    except sqlite3.OperationalError:
+        return {}
+    finally:
+        conn.close()
+
+
+def recalc(conn: sqlite3.Connection, guild_id: Optional[int], xp_factor: Optional[float], report) -> Tuple[int, Counter]:
+    """
+    Optional XP aller User skalieren (eine UPDATE-Anweisung), danach Level und
+    erreichte Meilensteine für jede Zeile blockweise berechnen.
+    Gibt zurück, wie viele User jeden Meilenstein erreicht haben.
+    """
+    if xp_factor is not None:
+        where, params = ("WHERE guild_id = ?", (xp_factor, guild_id)) if guild_id is not None else ("", (xp_factor,))
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f"UPDATE users SET xp = CAST(xp * ? AS INTEGER) {where}", params)
+        conn.execute("COMMIT")
+
+    milestones = _milestones_by_guild()
+    writer = csv.writer(report) if report else None
+    if writer:
+        writer.writerow(("guild_id", "user_id", "xp", "level", "milestones"))
+
+    summary: Counter = Counter()
+    total = 0
+    cursor = _select_users(conn, guild_id)
+    while rows := cursor.fetchmany(CHUNK_SIZE):
+        total += len(rows)
+        levels = levels_for(row[2] for row in rows)
+        for (gid, user_id, xp, _), level in zip(rows, levels):
+            guild_milestones = milestones.get(gid, DEFAULT_LEVEL_MILESTONES)
+            reached = guild_milestones[:bisect_right(guild_milestones, level)]
+            summary.update(reached)
+            if writer:
+                writer.writerow((gid, user_id, xp, level, " ".join(map(str, reached))))
+    return total, summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Level-Daten exportieren, importieren und neu berechnen")
+    parser.add_argument("--db", default=get_level_db_path(), help="Pfad zur level.db")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_export = sub.add_parser("export", help="level.db als CSV/JSONL exportieren")
+    p_export.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+    p_export.add_argument("-o", "--output", default="-", help="Datei oder - für stdout")
+    p_export.add_argument("--guild", type=int)
+
+    p_import = sub.add_parser("import", help="CSV/JSONL in level.db importieren")
+    p_import.add_argument("file")
+    p_import.add_argument("--format", choices=("csv", "jsonl"), help="Standard: anhand der Dateiendung")
+    p_import.add_argument("--guild", type=int, help="Guild-ID für Zeilen ohne guild_id")
+    p_import.add_argument("--mode", choices=("replace", "add"), default="replace")
+
+    p_recalc = sub.add_parser("recalc", help="Level und Meilensteine für alle User neu berechnen")
+    p_recalc.add_argument("--guild", type=int)
+    p_recalc.add_argument("--xp-factor", type=float, help="Alle XP vorher mit diesem Faktor skalieren")
+    p_recalc.add_argument("-o", "--output", help="Optionaler CSV-Report pro User")
+
+    args = parser.parse_args(argv)
+    conn = _connect(args.db)
+    start = time.perf_counter()
+    try:
+        if args.command == "export":
+            out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+            try:
+                count = export_rows(conn, out, args.format, args.guild)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            print(f"{count} Zeilen exportiert", file=sys.stderr)
+        elif args.command == "import":
+            fmt = args.format or ("jsonl" if args.file.endswith((".jsonl", ".json")) else "csv")
+            count = import_rows(conn, _parse_rows(args.file, fmt, args.guild), args.mode)
+            print(f"{count} Zeilen importiert ({args.mode})", file=sys.stderr)
+        elif args.command == "recalc":
+            report = open(args.output, "w", newline="", encoding="utf-8") if args.output else None
+            try:
+                total, summary = recalc(conn, args.guild, args.xp_factor, report)
+            finally:
+                if report:
+                    report.close()
+            print(f"{total} User neu berechnet", file=sys.stderr)
+            for level in sorted(summary):
+                print(f"Meilenstein Level {level}: {summary[level]} User", file=sys.stderr)
+    finally:
+        conn.close()
+    print(f"Dauer: {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
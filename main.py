@@ -1,8 +1,13 @@
 import discord
 import ezcord
+import logging
 import os
 from dotenv import load_dotenv
 from source.settings import settings
+from source.database import database
+from source.migrations import migrate_all
+from source.cards import shutdown_render_pool
+from source.avatars import avatars
 
 
 
@@ -10,7 +15,33 @@ load_dotenv()
 status = discord.Status.dnd
 
 
-bot = ezcord.Bot(
+class DiscordBot(ezcord.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.add_listener(self._start_config_watch, "on_ready")
+
+    async def _start_config_watch(self):
+        # Änderungen aus dem Dashboard (anderer Prozess) in den Config-Cache übernehmen
+        settings.start_config_watch()
+
+    async def close(self):
+        # Cogs mit Write-Behind-Puffern die Chance geben, alles zu schreiben
+        for cog in list(self.cogs.values()):
+            shutdown = getattr(cog, "cog_shutdown", None)
+            if shutdown is not None:
+                try:
+                    await shutdown()
+                except Exception as e:
+                    logging.getLogger('discord_bot').error(f"Shutdown von {cog.qualified_name} fehlgeschlagen: {e}")
+        # Geteilte DB-Verbindungen und Config-DB-Thread sauber beenden
+        await database.close()
+        await avatars.close()
+        settings.close()
+        shutdown_render_pool()
+        await super().close()
+
+
+bot = DiscordBot(
     intents=discord.Intents.all(),
     language="de",
     debug_guilds=[1427289795931144334],
@@ -26,7 +57,31 @@ def log_folder_exist():
     else:
         print(f"Nested folders '{folder_path}' already exist.")
 
+def debug_rate_limits_from_env(value: str | None) -> dict[str, float] | None:
+    """
+    LOG_DEBUG_RATE: "20" (alle Logger) oder "discord_bot=5,*=20" - max. DEBUG-Zeilen pro Sekunde
+    """
+    if not value:
+        return None
+    limits = {}
+    for entry in value.split(","):
+        name, _, rate = entry.strip().rpartition("=")
+        try:
+            limits[name.strip() or "*"] = float(rate)
+        except ValueError:
+            print(f"LOG_DEBUG_RATE: ungültiger Eintrag '{entry}' wird ignoriert")
+    return limits or None
+
+
 if __name__ == "__main__":
+    settings.setup_logger(
+        json_format=os.getenv("LOG_JSON", "").lower() in ("1", "true", "yes"),
+        debug_rate_limits=debug_rate_limits_from_env(os.getenv("LOG_DEBUG_RATE")),
+    )
+    migrate_all()
     bot.load_cogs("cogs")
-    settings.setup_logger()
-    bot.run(os.getenv("TOKEN"))
+    try:
+        bot.run(os.getenv("TOKEN"))
+    finally:
+        # Restliche Log-Zeilen aus der Queue schreiben
+        settings.shutdown_logger()
@@ -0,0 +1,192 @@
+"""
+Avatar-Downloads über eine geteilte aiohttp-Session.
+Avatare werden in kleiner Größe angefordert und per Avatar-Hash zwischengespeichert:
+im Speicher (LRU) und optional als Datei unter data/avatars. Der Festplatten-Cache
+ist auf AVATAR_DISK_CACHE_FILES Dateien begrenzt, die ältesten (nach mtime) fliegen zuerst.
+"""
+
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import aiohttp
+import discord
+
+from source.paths import get_avatar_cache_dir
+
+
+logger = logging.getLogger('discord_bot')
+
+AVATAR_SIZE = 256  # Karten zeigen Avatare mit 150px
+AVATAR_CACHE_SIZE = 512
+AVATAR_CONCURRENCY = 8
+AVATAR_TIMEOUT = 5  # Sekunden
+AVATAR_DISK_CACHE_FILES = 5000  # ~40 KB pro Avatar -> rund 200 MB
+AVATAR_DISK_PRUNE_TO = 0.9  # beim Aufräumen auf 90% des Limits kürzen, nicht bei jedem Schreiben
+
+
+class AvatarFetcher:
+    def __init__(self, cache_size: int = AVATAR_CACHE_SIZE, disk_cache: bool = True,
+                 disk_cache_files: int = AVATAR_DISK_CACHE_FILES):
+        self.cache_size = cache_size
+        self.disk_dir = get_avatar_cache_dir() if disk_cache else None
+        self.disk_cache_files = disk_cache_files
+        self._disk_count: Optional[int] = None  # wird beim ersten Schreiben einmal gezählt
+        self._pruning = False
+        self._cache: "OrderedDict[str, bytes]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=AVATAR_TIMEOUT),
+                connector=aiohttp.TCPConnector(limit=AVATAR_CONCURRENCY),
+            )
+            self._semaphore = asyncio.Semaphore(AVATAR_CONCURRENCY)
+        return self._session
+
+    def _cache_put(self, key: str, data: bytes):
+        self._cache[key] = data
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        return os.path.join(self.disk_dir, f"{key}.png") if self.disk_dir else None
+
+    @staticmethod
+    def _read_file(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        # mtime als "zuletzt benutzt" - häufig gebrauchte Avatare überleben das Aufräumen
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    @staticmethod
+    def _write_file(path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _count_files(folder: str) -> int:
+        with os.scandir(folder) as entries:
+            return sum(1 for entry in entries if entry.name.endswith(".png"))
+
+    @staticmethod
+    def _prune_files(folder: str, keep: int) -> int:
+        """Löscht die ältesten Dateien, bis höchstens `keep` übrig sind"""
+        files = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".png"):
+                    continue
+                try:
+                    files.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    continue
+        files.sort()
+        removed = 0
+        for _, path in files[:max(len(files) - keep, 0)]:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return len(files) - removed
+
+    async def _track_disk_write(self):
+        if self._disk_count is None:
+            self._disk_count = await asyncio.to_thread(self._count_files, self.disk_dir)
+        else:
+            self._disk_count += 1
+        if self._disk_count <= self.disk_cache_files or self._pruning:
+            return
+        self._pruning = True
+        try:
+            keep = int(self.disk_cache_files * AVATAR_DISK_PRUNE_TO)
+            self._disk_count = await asyncio.to_thread(self._prune_files, self.disk_dir, keep)
+        except OSError as e:
+            logger.warning(f"Avatar-Cache konnte nicht aufgeräumt werden: {e}")
+        finally:
+            self._pruning = False
+
+    async def fetch(self, asset: discord.Asset, size: int = AVATAR_SIZE) -> bytes:
+        """PNG-Bytes eines Avatars - aus dem Cache oder einmalig heruntergeladen"""
+        key = f"{asset.key}_{size}"
+        data = self._cache.get(key)
+        if data is not None:
+            self._cache.move_to_end(key)
+            return data
+
+        # Gleichzeitige Anfragen für denselben Avatar teilen sich einen Download
+        pending = self._inflight.get(key)
+        if pending is not None:
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # der eigene Task wurde abgebrochen
+                # Der Download-Besitzer wurde abgebrochen - selbst neu laden
+                return await self.fetch(asset, size)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            data = await self._load(key, asset, size)
+            self._cache_put(key, data)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            # Exception wird an den Aufrufer weitergegeben, wartende Tasks bekommen sie über das Future
+            future.exception()
+            raise
+        finally:
+            # Bei Abbruch (Entladen, Beenden, abgebrochenes /rank) dürfen wartende Tasks nicht hängen bleiben
+            if not future.done():
+                future.cancel()
+            self._inflight.pop(key, None)
+
+    async def _load(self, key: str, asset: discord.Asset, size: int) -> bytes:
+        path = self._disk_path(key)
+        if path:
+            data = await asyncio.to_thread(self._read_file, path)
+            if data is not None:
+                return data
+
+        session = self._get_session()
+        url = asset.with_static_format("png").with_size(size).url
+        async with self._semaphore:
+            async with session.get(url) as response:
+                response.raise_for_status()
+                data = await response.read()
+
+        if path:
+            try:
+                await asyncio.to_thread(self._write_file, path, data)
+                await self._track_disk_write()
+            except OSError as e:
+                logger.warning(f"Avatar konnte nicht auf die Festplatte geschrieben werden: {e}")
+        return data
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+# Singleton-Instanz
+avatars = AvatarFetcher()
@@ -0,0 +1,137 @@
+"""
+Bild-Rendering in einem Prozess-Pool, damit PIL den Gateway-Loop nie blockiert.
+Die Render-Funktionen laufen in den Worker-Prozessen; Fonts und Hintergründe
+werden pro Worker einmal geladen und danach wiederverwendet.
+"""
+
+import asyncio
+import io
+import multiprocessing
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict
+
+from easy_pil import Canvas, Editor, Font
+from PIL import Image
+
+
+RENDER_WORKERS = 2
+
+RANK_CARD_SIZE = (900, 250)
+RANK_CARD_BACKGROUND = "#23272A"
+
+# Vorgerenderte "WELCOME TO <Guild>"-Ebenen pro Worker
+WELCOME_GUILD_LAYER_CACHE = 128
+
+# Letzte N Renderzeiten pro Funktion für p50/p99
+RENDER_TIMING_SAMPLES = 1024
+
+_pool: ProcessPoolExecutor | None = None
+_timings: Dict[str, deque] = defaultdict(lambda: deque(maxlen=RENDER_TIMING_SAMPLES))
+
+
+def get_render_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn statt fork: der Bot-Prozess hat bereits Threads (DB, Logging)
+        _pool = ProcessPoolExecutor(
+            max_workers=RENDER_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+async def render(func, *args) -> bytes:
+    """Führt eine Render-Funktion im Prozess-Pool aus (Zeit inkl. Wartezeit im Pool wird gemessen)"""
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    try:
+        return await loop.run_in_executor(get_render_pool(), func, *args)
+    finally:
+        _timings[func.__name__].append((time.perf_counter() - start) * 1000)
+
+
+def render_stats() -> Dict[str, Dict[str, float]]:
+    """p50/p99 der letzten Renderzeiten pro Funktion (Millisekunden)"""
+    stats = {}
+    for name, samples in _timings.items():
+        if not samples:
+            continue
+        ordered = sorted(samples)
+        stats[name] = {
+            "count": len(ordered),
+            "p50_ms": round(ordered[len(ordered) // 2], 1),
+            "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 1),
+        }
+    return stats
+
+
+def shutdown_render_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# --- Worker-Caches ---
+@lru_cache(maxsize=None)
+def _font(size: int, variant: str) -> Font:
+    return Font.poppins(size=size, variant=variant)
+
+
+@lru_cache(maxsize=None)
+def _rank_background() -> Image.Image:
+    return Editor(Canvas(RANK_CARD_SIZE, color=RANK_CARD_BACKGROUND)).image
+
+
+@lru_cache(maxsize=None)
+def _welcome_background(image_path: str) -> Image.Image:
+    return Image.open(image_path).convert("RGBA")
+
+
+@lru_cache(maxsize=WELCOME_GUILD_LAYER_CACHE)
+def _welcome_guild_layer(image_path: str, guild_name: str) -> Image.Image:
+    """Hintergrund mit bereits geschriebenem Guild-Namen - ändert sich nur mit dem Namen"""
+    layer = Editor(_welcome_background(image_path).copy())
+    layer.text((400, 260), f"WELCOME TO {guild_name}", color="white", font=_font(40, "bold"), align="center")
+    return layer.image
+
+
+def _to_png(editor: Editor) -> bytes:
+    buffer = io.BytesIO()
+    editor.image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# --- Render-Funktionen (laufen im Worker) ---
+def render_rank_card(avatar_bytes: bytes, name: str, level: int, xp_into_level: int, xp_for_level: int) -> bytes:
+    card = Editor(_rank_background().copy())
+
+    avatar = Editor(Image.open(io.BytesIO(avatar_bytes)).convert("RGBA")).resize((150, 150)).circle_image()
+    card.paste(avatar, (40, 50))
+    card.ellipse((40, 50), 150, 150, outline="gold", stroke_width=4)
+
+    card.text((230, 45), name, font=_font(40, "bold"), color="white")
+    card.text((230, 105), f"Level {level}", font=_font(25, "light"), color="white")
+    card.text((860, 130), f"{xp_into_level} / {xp_for_level} XP", font=_font(20, "light"), color="white", align="right")
+
+    percentage = max(0, min(100, int(xp_into_level * 100 / xp_for_level))) if xp_for_level else 0
+    card.rectangle((230, 165), width=630, height=30, color="#484B4E", radius=15)
+    if percentage > 0:
+        card.bar((230, 165), max_width=630, height=30, percentage=percentage, color="gold", radius=15)
+
+    return _to_png(card)
+
+
+def render_welcome_card(image_path: str, guild_name: str, avatar_bytes: bytes, display_name: str, position: str) -> bytes:
+    card = Editor(_welcome_guild_layer(image_path, guild_name).copy())
+
+    avatar = Editor(Image.open(io.BytesIO(avatar_bytes)).convert("RGBA")).resize((150, 150)).circle_image()
+    card.paste(avatar, (325, 90))
+    card.ellipse((325, 90), 150, 150, outline="gold", stroke_width=4)
+
+    card.text((400, 325), display_name, color="red", font=_font(25, "light"), align="center")
+    card.text((400, 360), f"You Are The {position} Member", color="red", font=_font(25, "light"), align="center")
+
+    return _to_png(card)
@@ -0,0 +1,176 @@
+"""
+Zentrale, geteilte aiosqlite-Verbindungen für alle Cogs.
+Pro Datenbank-Datei (siehe source/paths.py) gibt es genau eine langlebige
+Verbindung mit WAL, Busy-Timeout und Statement-Cache.
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterable, List, Optional
+
+import aiosqlite
+
+from source.migrations import migrate
+
+
+logger = logging.getLogger('discord_bot')
+
+BUSY_TIMEOUT_MS = 5000
+STATEMENT_CACHE_SIZE = 256
+
+
+class LatencyStats:
+    """Einfache Latenz-Zähler pro Verbindung (Millisekunden)"""
+
+    __slots__ = ("count", "total_ms", "max_ms", "errors")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.errors = 0
+
+    def record(self, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "errors": self.errors,
+        }
+
+
+class ManagedConnection:
+    """
+    Wrapper um eine langlebige aiosqlite-Verbindung.
+    - Lesende Queries laufen direkt
+    - Schreibende Queries werden über einen Lock serialisiert und committed,
+      damit sich Transaktionen verschiedener Coroutines nicht vermischen
+    """
+
+    def __init__(self, path: str, conn: aiosqlite.Connection):
+        self.path = path
+        self.conn = conn
+        self.lock = asyncio.Lock()
+        self.stats = LatencyStats()
+
+    @asynccontextmanager
+    async def _timed(self):
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.stats.errors += 1
+            raise
+        finally:
+            self.stats.record((time.perf_counter() - start) * 1000)
+
+    async def fetchone(self, sql: str, params: Iterable[Any] = ()) -> Optional[aiosqlite.Row]:
+        async with self._timed():
+            async with self.conn.execute(sql, params) as cursor:
+                return await cursor.fetchone()
+
+    async def fetchall(self, sql: str, params: Iterable[Any] = ()) -> List[aiosqlite.Row]:
+        async with self._timed():
+            async with self.conn.execute(sql, params) as cursor:
+                return await cursor.fetchall()
+
+    async def execute(self, sql: str, params: Iterable[Any] = ()) -> aiosqlite.Cursor:
+        """Führt eine schreibende Query aus und committed sofort"""
+        async with self.lock, self._timed():
+            try:
+                cursor = await self.conn.execute(sql, params)
+                await self.conn.commit()
+            except BaseException:
+                # Auch bei Abbruch: sonst committed der nächste execute() eine halbe Transaktion
+                await self.conn.rollback()
+                raise
+            return cursor
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Iterable[Any]]) -> aiosqlite.Cursor:
+        """Führt eine Batch-Query in einer Transaktion aus"""
+        async with self.lock, self._timed():
+            try:
+                cursor = await self.conn.executemany(sql, seq_of_params)
+                await self.conn.commit()
+            except BaseException:
+                # Auch bei Abbruch: sonst committed der nächste execute() eine halbe Transaktion
+                await self.conn.rollback()
+                raise
+            return cursor
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Mehrere Statements atomar ausführen: `async with db.transaction() as conn: ...`"""
+        async with self.lock, self._timed():
+            try:
+                yield self.conn
+                await self.conn.commit()
+            except BaseException:
+                # Auch bei Abbruch: sonst committed der nächste execute() eine halbe Transaktion
+                await self.conn.rollback()
+                raise
+
+    async def close(self):
+        await self.conn.close()
+
+
+class DatabaseManager:
+    """Verwaltet eine geteilte Verbindung pro DB-Pfad"""
+
+    def __init__(self):
+        self._connections: Dict[str, ManagedConnection] = {}
+        self._open_lock = asyncio.Lock()
+
+    async def get(self, path: str) -> ManagedConnection:
+        """Gibt die (ggf. neu geöffnete) Verbindung für den Pfad zurück, z.B. `await database.get(get_level_db_path())`"""
+        managed = self._connections.get(path)
+        if managed is not None:
+            return managed
+        async with self._open_lock:
+            managed = self._connections.get(path)
+            if managed is None:
+                # Schema sicherstellen (no-op, wenn beim Start bereits migriert)
+                await asyncio.to_thread(migrate, path)
+                managed = ManagedConnection(path, await self._connect(path))
+                self._connections[path] = managed
+                logger.info("DB-Verbindung geöffnet: %s", path)
+        return managed
+
+    @staticmethod
+    async def _connect(path: str) -> aiosqlite.Connection:
+        conn = await aiosqlite.connect(
+            path,
+            timeout=BUSY_TIMEOUT_MS / 1000,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = aiosqlite.Row
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Latenz-Zähler aller offenen Verbindungen"""
+        return {path: managed.stats.as_dict() for path, managed in self._connections.items()}
+
+    async def close(self):
+        """Schließt alle Verbindungen (beim Shutdown)"""
+        for path, managed in list(self._connections.items()):
+            try:
+                await managed.close()
+            except Exception as e:
+                logger.warning(f"Konnte DB-Verbindung nicht schließen ({path}): {e}")
+        self._connections.clear()
+
+
+# Singleton-Instanz
+database = DatabaseManager()
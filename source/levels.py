@@ -0,0 +1,41 @@
+"""
+Level-Berechnung in geschlossener Form.
+
+Level n wird bei insgesamt 50 * n * (n - 1) XP erreicht
+(Level 2 ab 100 XP, Level 3 ab 300 XP, Level 4 ab 600 XP, ...).
+"""
+
+from math import isqrt
+from typing import Iterable, List, Tuple
+
+XP_STEP = 100  # Level n -> n+1 kostet n * XP_STEP
+
+
+def xp_for_level(level: int) -> int:
+    """Gesamt-XP, ab der ein Level erreicht ist"""
+    return XP_STEP * level * (level - 1) // 2
+
+
+def level_for_xp(xp: int) -> int:
+    """O(1): größtes n mit xp_for_level(n) <= xp"""
+    if xp <= 0:
+        return 1
+    # n * (n - 1) <= 2 * xp / XP_STEP  ->  n = (1 + sqrt(1 + 4q)) / 2
+    q = (2 * xp) // XP_STEP
+    return (1 + isqrt(1 + 4 * q)) // 2
+
+
+def level_progress(xp: int) -> Tuple[int, int, int]:
+    """(Level, XP im aktuellen Level, fehlende XP bis zum nächsten Level)"""
+    level = level_for_xp(xp)
+    start = xp_for_level(level)
+    return level, max(xp, 0) - start, xp_for_level(level + 1) - max(xp, 0)
+
+
+# --- Batch-Varianten für ganze Ranglisten ---
+def levels_for(xp_values: Iterable[int]) -> List[int]:
+    return list(map(level_for_xp, xp_values))
+
+
+def progress_for(xp_values: Iterable[int]) -> List[Tuple[int, int, int]]:
+    return list(map(level_progress, xp_values))
@@ -0,0 +1,256 @@
+"""
+Versionierte Schema-Migrationen für alle SQLite-Datenbanken.
+
+Jede Datenbank hat eine nummerierte Liste von Migrationen. Die aktuelle
+Version steht in der Tabelle `schema_version`. Beim Start werden alle
+ausstehenden Schritte in einer einzigen Transaktion ausgeführt.
+Neue Tabellen, Spalten oder Indizes werden einfach als neuer Eintrag
+unten angehängt - bestehende Einträge dürfen nicht verändert werden.
+"""
+
+import logging
+import sqlite3
+import threading
+from typing import Callable, Dict, List, Tuple, Union
+
+from source.paths import get_config_db_path, get_level_db_path, get_tickets_db_path
+
+
+logger = logging.getLogger('discord_bot')
+
+# Ein Schritt ist entweder SQL oder eine Funktion, die die Verbindung bekommt
+MigrationStep = Union[str, Callable[[sqlite3.Connection], None]]
+
+
+def _add_column_if_missing(table: str, column: str, col_type: str) -> Callable[[sqlite3.Connection], None]:
+    """ALTER TABLE ADD COLUMN, aber idempotent (für DBs, die vor den Migrationen erstellt wurden)"""
+    def step(conn: sqlite3.Connection):
+        columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_type}")
+    return step
+
+
+CONFIG_MIGRATIONS: List[Tuple[int, List[MigrationStep]]] = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS guild_config (
+            guild_id VARCHAR NOT NULL PRIMARY KEY,
+            mod_role_ids TEXT,
+            ticket_role_ids TEXT,
+            welcome_channel_id VARCHAR,
+            j2c_lobby_channel_id VARCHAR,
+            j2c_category_channel_id VARCHAR
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS j2c_state (
+            channel_id VARCHAR NOT NULL PRIMARY KEY,
+            guild_id VARCHAR NOT NULL,
+            kind VARCHAR NOT NULL,
+            category_id VARCHAR,
+            voice_channel_id VARCHAR,
+            name VARCHAR
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS ix_j2c_state_guild_id ON j2c_state (guild_id)",
+        """
+        CREATE TABLE IF NOT EXISTS calendar_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            description TEXT,
+            start_time TEXT NOT NULL,
+            end_time TEXT NOT NULL,
+            location TEXT,
+            creator_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, [
+        _add_column_if_missing("guild_config", "ticket_embed_channel_id", "VARCHAR"),
+        _add_column_if_missing("guild_config", "ticket_category_id", "VARCHAR"),
+    ]),
+    (3, [
+        "CREATE INDEX IF NOT EXISTS idx_calendar_events_guild_start ON calendar_events (guild_id, start_time)",
+    ]),
+    (4, [
+        _add_column_if_missing("guild_config", "voice_xp_multipliers", "TEXT"),
+    ]),
+    (5, [
+        _add_column_if_missing("guild_config", "level_role_ids", "TEXT"),
+    ]),
+]
+
+TICKETS_MIGRATIONS: List[Tuple[int, List[MigrationStep]]] = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS tickets (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS ticket_config (
+            guild_id INTEGER PRIMARY KEY,
+            allowed_roles TEXT NOT NULL,
+            role_names TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, [
+        "CREATE INDEX IF NOT EXISTS idx_tickets_channel ON tickets (channel_id)",
+    ]),
+    # Archivierte Ticket-Verläufe (Dateien unter data/transcripts, path ist relativ dazu)
+    (3, [
+        """
+        CREATE TABLE IF NOT EXISTS transcripts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            channel_name TEXT,
+            closed_by INTEGER,
+            path TEXT NOT NULL,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            attachment_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_transcripts_guild_created ON transcripts (guild_id, created_at DESC)",
+    ]),
+]
+
+LEVEL_MIGRATIONS: List[Tuple[int, List[MigrationStep]]] = [
+    (1, [
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id INTEGER PRIMARY KEY,
+            msg_count INTEGER DEFAULT 0,
+            xp INTEGER DEFAULT 0
+        )
+        """,
+    ]),
+    # XP pro Guild: bestehende (globale) Zeilen landen unter guild_id 0 und werden
+    # beim ersten Zugriff in einer Guild von LevelSystem übernommen
+    (2, [
+        "ALTER TABLE users RENAME TO users_global",
+        """
+        CREATE TABLE users (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            msg_count INTEGER NOT NULL DEFAULT 0,
+            xp INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """,
+        """
+        INSERT INTO users (guild_id, user_id, msg_count, xp)
+        SELECT 0, user_id, COALESCE(msg_count, 0), COALESCE(xp, 0) FROM users_global
+        """,
+        "DROP TABLE users_global",
+        "CREATE INDEX IF NOT EXISTS idx_users_guild_xp ON users (guild_id, xp DESC, user_id)",
+    ]),
+    # Checkpoints laufender Voice-Sessions (überleben einen Neustart)
+    (3, [
+        """
+        CREATE TABLE IF NOT EXISTS voice_sessions (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            started_at REAL NOT NULL,
+            credited_until REAL NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        )
+        """,
+    ]),
+    # Tägliche XP-Rollups (day = Tage seit 1970-01-01 UTC) für Zeitraum-Ranglisten
+    (4, [
+        """
+        CREATE TABLE IF NOT EXISTS xp_daily (
+            guild_id INTEGER NOT NULL,
+            day INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            xp INTEGER NOT NULL DEFAULT 0,
+            msg_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (guild_id, day, user_id)
+        ) WITHOUT ROWID
+        """,
+    ]),
+]
+
+
+def _registry() -> Dict[str, List[Tuple[int, List[MigrationStep]]]]:
+    return {
+        get_config_db_path(): CONFIG_MIGRATIONS,
+        get_tickets_db_path(): TICKETS_MIGRATIONS,
+        get_level_db_path(): LEVEL_MIGRATIONS,
+    }
+
+
+_migrated: set = set()
+_migrate_lock = threading.Lock()
+
+
+def current_version(conn: sqlite3.Connection) -> int:
+    conn.execute("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)")
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(db_path: str, migrations: List[Tuple[int, List[MigrationStep]]]) -> int:
+    """
+    Führt alle ausstehenden Migrationen für eine Datenbank aus.
+    Alles läuft in einer Transaktion - schlägt ein Schritt fehl, bleibt die DB unverändert.
+    Gibt die neue Schema-Version zurück.
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = current_version(conn)
+            pending = [(v, steps) for v, steps in sorted(migrations, key=lambda m: m[0]) if v > version]
+            for target, steps in pending:
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(step)
+                version = target
+            if pending:
+                conn.execute("DELETE FROM schema_version")
+                conn.execute("INSERT INTO schema_version (version) VALUES (?)", (version,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if pending:
+            logger.info("DB migriert: %s -> Version %s", db_path, version)
+        return version
+    finally:
+        conn.close()
+
+
+def migrate(db_path: str) -> int | None:
+    """Migriert eine bekannte Datenbank (nur einmal pro Prozess)"""
+    with _migrate_lock:
+        if db_path in _migrated:
+            return None
+        migrations = _registry().get(db_path)
+        if migrations is None:
+            raise KeyError(f"Keine Migrationen registriert für {db_path}")
+        version = apply_migrations(db_path, migrations)
+        _migrated.add(db_path)
+        return version
+
+
+def migrate_all():
+    """Migriert alle Datenbanken - wird einmal beim Start aufgerufen"""
+    for db_path in _registry():
+        migrate(db_path)
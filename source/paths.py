@@ -23,6 +23,8 @@ BOT_LOG = LOGS_DIR / "bot.log"
 DATA_DIR = PROJECT_ROOT / "data"
 IMAGES_DIR = DATA_DIR / "Images"
 WELCOME_IMAGE = IMAGES_DIR / "pic1.jpg"
+AVATAR_CACHE_DIR = DATA_DIR / "avatars"
+TRANSCRIPTS_DIR = DATA_DIR / "transcripts"
 
 # Temporäre Daten
 TEMP_DATA_DIR = PROJECT_ROOT / "source"
@@ -68,6 +70,16 @@ def get_welcome_image_path() -> str:
     return str(WELCOME_IMAGE)
 
 
+def get_avatar_cache_dir() -> str:
+    """Gibt den Pfad zum Avatar-Cache (Festplatte) zurück"""
+    return str(AVATAR_CACHE_DIR)
+
+
+def get_transcripts_dir() -> str:
+    """Gibt den Pfad zum Ticket-Transkript-Archiv zurück"""
+    return str(TRANSCRIPTS_DIR)
+
+
 def get_temp_data_file_path() -> str:
     """Gibt den Pfad zur temporären Datendatei zurück"""
     return str(TEMP_DATA_FILE)
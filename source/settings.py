@@ -1,17 +1,32 @@
+import asyncio
+import atexit
+import functools
 import logging
 import os
 import json
-from logging.handlers import RotatingFileHandler
-from typing import Any, Dict, List, Optional
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from sqlalchemy import Boolean, Column, String, Integer, Text, create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from source.paths import get_logs_dir_path, get_bot_log_path, get_config_db_path
+from source.migrations import migrate
 
 
 Base = declarative_base()
 
+# Maximale Anzahl Guilds, deren Config im Speicher gehalten wird (LRU)
+CONFIG_CACHE_SIZE = 1024
+# Wie oft config.db auf Änderungen anderer Prozesse (Dashboard) geprüft wird
+CONFIG_POLL_SECONDS = 5
+
 
 class GuildConfig(Base):
     __tablename__ = "guild_config"
@@ -23,6 +38,8 @@ class GuildConfig(Base):
     j2c_category_channel_id = Column(String, nullable=True)
     ticket_embed_channel_id = Column(String, nullable=True)  # Channel für Ticket Embed
     ticket_category_id = Column(String, nullable=True)  # Kategorie für Tickets
+    voice_xp_multipliers = Column(Text, nullable=True)  # JSON {channel_id: multiplier}
+    level_role_ids = Column(Text, nullable=True)  # JSON {level: role_id}
 
 
 class J2CState(Base):
@@ -35,19 +52,125 @@ class J2CState(Base):
     name = Column(String, nullable=True)
 
 
+class JsonFormatter(logging.Formatter):
+    """Strukturierte Logs: eine JSON-Zeile pro Eintrag"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "time": self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+class DebugRateLimitFilter(logging.Filter):
+    """
+    Begrenzt DEBUG-Zeilen pro Logger (Token Bucket, Zeilen pro Sekunde).
+    INFO und höher werden nie verworfen.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._buckets: Dict[str, List[float]] = {}  # logger -> [tokens, last_ts]
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.rates.get(record.name, self.rates.get("*"))
+        if rate is None:
+            return True
+        capacity = max(rate, 1.0)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(record.name)
+            if bucket is None:
+                bucket = self._buckets[record.name] = [capacity, now]
+            tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                self.dropped += 1
+                return False
+            bucket[0] = tokens - 1
+            return True
+
+
+def _config_to_dict(obj: GuildConfig) -> Dict[str, Any]:
+    """Wandelt eine GuildConfig-Zeile in ein Dict mit dekodierten Rollen-Listen um"""
+    return {
+        "guild_id": obj.guild_id,
+        "mod_role_ids": json.loads(obj.mod_role_ids) if obj.mod_role_ids else [],
+        "ticket_role_ids": json.loads(obj.ticket_role_ids) if obj.ticket_role_ids else [],
+        "welcome_channel_id": obj.welcome_channel_id,
+        "j2c_lobby_channel_id": obj.j2c_lobby_channel_id,
+        "j2c_category_channel_id": obj.j2c_category_channel_id,
+        "ticket_embed_channel_id": obj.ticket_embed_channel_id,
+        "ticket_category_id": obj.ticket_category_id,
+        "voice_xp_multipliers": json.loads(obj.voice_xp_multipliers) if obj.voice_xp_multipliers else {},
+        "level_role_ids": json.loads(obj.level_role_ids) if obj.level_role_ids else {},
+    }
+
+
+def _copy_config(cfg: Dict[str, Any]) -> Dict[str, Any]:
+    """Kopie (inkl. Listen), damit Aufrufer den Cache nicht verändern können"""
+    copied = dict(cfg)
+    for key, value in copied.items():
+        if isinstance(value, list):
+            copied[key] = list(value)
+        elif isinstance(value, dict):
+            copied[key] = dict(value)
+    return copied
+
+
 class Settings:
     def __init__(self):
         self.logger = None
         self.engine = None
         self.SessionLocal = None
+        # Write-Through Cache: guild_id -> dekodierte Config (LRU, begrenzt)
+        self._config_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._config_cache_size = CONFIG_CACHE_SIZE
+        self._config_lock = threading.Lock()
+        # Eigener DB-Thread, damit async Listener den Event-Loop nicht blockieren
+        self._db_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="config-db")
+        # J2C Registry: channel_id -> Eintrag, plus Indizes nach Guild und Kategorie-Voice-Channel
+        self._j2c_entries: Dict[str, Dict[str, Any]] = {}
+        self._j2c_by_guild: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._j2c_by_voice: Dict[str, Dict[str, Any]] = {}
+        self._j2c_loaded = False
+        self._j2c_lock = threading.Lock()
+        self._log_listener: Optional[QueueListener] = None
+        self._log_atexit_registered = False
+        # Callbacks (guild_id, geänderte Keys) nach aupdate_config, z.B. für abgeleitete Caches in Cogs
+        self._config_listeners: List[Callable[[int, Set[str]], None]] = []
+        # Erkennung externer Schreibzugriffe über PRAGMA data_version (nur im DB-Thread benutzt)
+        self._watch_conn: Optional[sqlite3.Connection] = None
+        self._data_version: Optional[int] = None
+        self._watch_task: Optional[asyncio.Task] = None
     
-    def setup_logger(self):
+    def setup_logger(
+        self,
+        use_queue: bool = True,
+        json_format: bool = False,
+        debug_rate_limits: Optional[Dict[str, float]] = None,
+    ):
         """
         Richtet das Logging-System ein mit rotating file handler.
         - Logs werden in 'logs/bot.log' gespeichert
         - Maximal 5 Dateien
         - Maximale Größe pro Datei: 5MB
         - Wenn 5 Dateien erreicht sind, wird die älteste entfernt
+        - use_queue: Datei-/Konsolen-I/O läuft in einem Hintergrund-Thread (QueueListener),
+          der Event-Loop legt Records nur in eine Queue
+        - json_format: eine JSON-Zeile pro Log-Eintrag
+        - debug_rate_limits: {logger_name: max. DEBUG-Zeilen pro Sekunde}, "*" gilt für alle
         """
         # Erstelle logs Ordner falls nicht vorhanden
         log_folder = get_logs_dir_path()
@@ -55,6 +178,9 @@ class Settings:
             os.makedirs(log_folder)
             print(f"Ordner '{log_folder}' wurde erstellt.")
         
+        # Evtl. laufenden Listener vorher sauber stoppen
+        self.shutdown_logger()
+
         # Logger konfigurieren
         self.logger = logging.getLogger('discord_bot')
         self.logger.setLevel(logging.DEBUG)
@@ -77,93 +203,161 @@ class Settings:
         console_handler.setLevel(logging.INFO)
         
         # Formatter für Log-Nachrichten
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
+        if json_format:
+            formatter = JsonFormatter()
+        else:
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                datefmt='%Y-%m-%d %H:%M:%S'
+            )
         file_handler.setFormatter(formatter)
         console_handler.setFormatter(formatter)
         
-        # Handler zum Logger hinzufügen
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
+        rate_filter = DebugRateLimitFilter(debug_rate_limits) if debug_rate_limits else None
+
+        if use_queue:
+            # Logger -> QueueHandler -> (Hintergrund-Thread) -> File/Console
+            log_queue = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            queue_handler.setLevel(logging.DEBUG)
+            if rate_filter:
+                queue_handler.addFilter(rate_filter)
+            self._log_listener = QueueListener(
+                log_queue, file_handler, console_handler, respect_handler_level=True
+            )
+            self._log_listener.start()
+            self.logger.addHandler(queue_handler)
+            if not self._log_atexit_registered:
+                atexit.register(self.shutdown_logger)
+                self._log_atexit_registered = True
+        else:
+            if rate_filter:
+                file_handler.addFilter(rate_filter)
+                console_handler.addFilter(rate_filter)
+            # Handler zum Logger hinzufügen
+            self.logger.addHandler(file_handler)
+            self.logger.addHandler(console_handler)
         
         self.logger.info("Logger wurde erfolgreich eingerichtet.")
         
         return self.logger
 
+    def shutdown_logger(self):
+        """Schreibt alle noch in der Queue liegenden Log-Zeilen und stoppt den Listener"""
+        listener = self._log_listener
+        if listener is None:
+            return
+        self._log_listener = None
+        listener.stop()
+        for handler in listener.handlers:
+            try:
+                handler.flush()
+                handler.close()
+            except Exception:
+                pass
+
     # --- SQL initialisieren ---
     def init_db(self):
         db_path = get_config_db_path()
+        # Schema wird ausschließlich über source/migrations.py verwaltet
+        migrate(db_path)
         self.engine = create_engine(
             f"sqlite:///{db_path}", connect_args={"check_same_thread": False}
         )
         self.SessionLocal = sessionmaker(bind=self.engine, expire_on_commit=False)
-        Base.metadata.create_all(self.engine)
-        
-        # Automatische Migration: Füge fehlende Spalten hinzu
-        self._migrate_db()
-        
+
         if self.logger:
             self.logger.info("Config-DB initialisiert: %s", db_path)
 
-    def _migrate_db(self):
-        """Füge neue Spalten hinzu, falls sie fehlen (für DB-Updates)"""
-        import sqlite3
-        try:
-            db_path = get_config_db_path()
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
-            # Hole alle Spalten der guild_config Tabelle
-            cursor.execute("PRAGMA table_info(guild_config)")
-            columns = {row[1] for row in cursor.fetchall()}
-            
-            # Neue Spalten, die hinzugefügt werden müssen
-            new_columns = [
-                ("ticket_embed_channel_id", "VARCHAR"),
-                ("ticket_category_id", "VARCHAR"),
-            ]
-            
-            # Füge fehlende Spalten hinzu
-            for col_name, col_type in new_columns:
-                if col_name not in columns:
-                    alter_sql = f"ALTER TABLE guild_config ADD COLUMN {col_name} {col_type}"
-                    cursor.execute(alter_sql)
-                    if self.logger:
-                        self.logger.info(f"Spalte hinzugefügt: {col_name}")
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            if self.logger:
-                self.logger.warning(f"DB Migration fehlgeschlagen (ignoriert): {e}")
-
     def _ensure_session(self):
         if self.SessionLocal is None:
             self.init_db()
         return self.SessionLocal()
 
+    # --- GuildConfig Cache ---
+    def _cache_get(self, gid: str) -> Optional[Dict[str, Any]]:
+        with self._config_lock:
+            cfg = self._config_cache.get(gid)
+            if cfg is not None:
+                self._config_cache.move_to_end(gid)
+            return cfg
+
+    def _cache_put(self, gid: str, cfg: Dict[str, Any]):
+        with self._config_lock:
+            self._config_cache[gid] = cfg
+            self._config_cache.move_to_end(gid)
+            while len(self._config_cache) > self._config_cache_size:
+                self._config_cache.popitem(last=False)
+
+    def invalidate_config(self, guild_id: int | str | None = None):
+        """Entfernt eine Guild (oder alles) aus dem Config-Cache, z.B. nach externen DB-Änderungen"""
+        with self._config_lock:
+            if guild_id is None:
+                self._config_cache.clear()
+            else:
+                self._config_cache.pop(str(guild_id), None)
+
+    def check_external_changes(self) -> Dict[int, Set[str]]:
+        """
+        Prüft (im DB-Thread), ob eine andere Verbindung config.db geändert hat.
+        PRAGMA data_version ändert sich nur dann - im Normalfall kostet die Prüfung eine Abfrage.
+        Bei einer Änderung werden die gecachten Guilds neu gelesen; zurückgegeben werden
+        {guild_id: geänderte Keys} der Guilds, deren Config sich tatsächlich geändert hat.
+        """
+        if self._watch_conn is None:
+            self._watch_conn = sqlite3.connect(get_config_db_path(), check_same_thread=False)
+        version = self._watch_conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return {}
+        first_check = self._data_version is None
+        self._data_version = version
+        if first_check:
+            return {}
+
+        with self._config_lock:
+            cached = {gid: cfg for gid, cfg in self._config_cache.items()}
+        if not cached:
+            return {}
+
+        session = self._ensure_session()
+        try:
+            fresh = {
+                obj.guild_id: _config_to_dict(obj)
+                for obj in session.query(GuildConfig).filter(GuildConfig.guild_id.in_(list(cached)))
+            }
+        finally:
+            session.close()
+
+        changes: Dict[int, Set[str]] = {}
+        for gid, old in cached.items():
+            new = fresh.get(gid)
+            if new is None:
+                self.invalidate_config(gid)
+                changes[int(gid)] = set(old) - {"guild_id"}
+                continue
+            keys = {key for key in new if new[key] != old.get(key)}
+            if keys:
+                self._cache_put(gid, new)
+                changes[int(gid)] = keys
+        return changes
+
     # --- GuildConfig Helpers ---
     def get_config(self, guild_id: int | str) -> Dict[str, Any]:
-        session = self._ensure_session()
         gid = str(guild_id)
+        cached = self._cache_get(gid)
+        if cached is not None:
+            return _copy_config(cached)
+
+        session = self._ensure_session()
         try:
             obj = session.get(GuildConfig, gid)
             if obj is None:
                 obj = GuildConfig(guild_id=gid)
                 session.add(obj)
                 session.commit()
-            return {
-                "guild_id": obj.guild_id,
-                "mod_role_ids": json.loads(obj.mod_role_ids) if obj.mod_role_ids else [],
-                "ticket_role_ids": json.loads(obj.ticket_role_ids) if obj.ticket_role_ids else [],
-                "welcome_channel_id": obj.welcome_channel_id,
-                "j2c_lobby_channel_id": obj.j2c_lobby_channel_id,
-                "j2c_category_channel_id": obj.j2c_category_channel_id,
-                "ticket_embed_channel_id": obj.ticket_embed_channel_id,
-                "ticket_category_id": obj.ticket_category_id,
-            }
+            cfg = _config_to_dict(obj)
+            self._cache_put(gid, cfg)
+            return _copy_config(cfg)
         finally:
             session.close()
 
@@ -189,61 +383,219 @@ class Settings:
                 obj.ticket_embed_channel_id = str(updates["ticket_embed_channel_id"]) if updates["ticket_embed_channel_id"] else None
             if "ticket_category_id" in updates:
                 obj.ticket_category_id = str(updates["ticket_category_id"]) if updates["ticket_category_id"] else None
+            if "voice_xp_multipliers" in updates:
+                obj.voice_xp_multipliers = json.dumps(
+                    {str(cid): float(mult) for cid, mult in (updates["voice_xp_multipliers"] or {}).items()}
+                )
+            if "level_role_ids" in updates:
+                obj.level_role_ids = json.dumps(
+                    {str(level): str(rid) for level, rid in (updates["level_role_ids"] or {}).items()}
+                )
             session.commit()
-            return self.get_config(gid)
+            cfg = _config_to_dict(obj)
+            self._cache_put(gid, cfg)
+            return _copy_config(cfg)
         finally:
             session.close()
 
     # --- JoinToCreate State ---
-    def add_j2c_clone(self, guild_id: int | str, channel_id: int | str, name: Optional[str] = None):
-        session = self._ensure_session()
-        try:
-            session.merge(J2CState(channel_id=str(channel_id), guild_id=str(guild_id), kind="clone", name=name))
-            session.commit()
-        finally:
-            session.close()
+    # In-Memory Registry (einmal geladen), Persistenz erfolgt write-behind im DB-Thread
+    def _ensure_j2c_loaded(self):
+        if self._j2c_loaded:
+            return
+        with self._j2c_lock:
+            if self._j2c_loaded:
+                return
+            session = self._ensure_session()
+            try:
+                for r in session.query(J2CState).all():
+                    self._j2c_index({
+                        "channel_id": r.channel_id,
+                        "guild_id": r.guild_id,
+                        "kind": r.kind,
+                        "category_id": r.category_id,
+                        "voice_channel_id": r.voice_channel_id,
+                        "name": r.name,
+                    })
+            finally:
+                session.close()
+            self._j2c_loaded = True
 
-    def add_j2c_category(self, guild_id: int | str, category_id: int | str, voice_channel_id: int | str, name: Optional[str] = None):
+    def _j2c_index(self, entry: Dict[str, Any]):
+        old = self._j2c_entries.get(entry["channel_id"])
+        if old is not None:
+            self._j2c_unindex(old)
+        self._j2c_entries[entry["channel_id"]] = entry
+        self._j2c_by_guild.setdefault(entry["guild_id"], {})[entry["channel_id"]] = entry
+        if entry["kind"] == "category" and entry["voice_channel_id"]:
+            self._j2c_by_voice[entry["voice_channel_id"]] = entry
+
+    def _j2c_unindex(self, entry: Dict[str, Any]):
+        self._j2c_entries.pop(entry["channel_id"], None)
+        guild_entries = self._j2c_by_guild.get(entry["guild_id"])
+        if guild_entries is not None:
+            guild_entries.pop(entry["channel_id"], None)
+            if not guild_entries:
+                del self._j2c_by_guild[entry["guild_id"]]
+        if entry["kind"] == "category" and entry["voice_channel_id"]:
+            if self._j2c_by_voice.get(entry["voice_channel_id"]) is entry:
+                del self._j2c_by_voice[entry["voice_channel_id"]]
+
+    def _persist_j2c(self, entry: Dict[str, Any]):
         session = self._ensure_session()
         try:
-            session.merge(
-                J2CState(
-                    channel_id=str(category_id), guild_id=str(guild_id), kind="category",
-                    category_id=str(category_id), voice_channel_id=str(voice_channel_id), name=name
-                )
-            )
+            session.merge(J2CState(**entry))
             session.commit()
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"J2C-Eintrag konnte nicht gespeichert werden ({entry['channel_id']}): {e}")
         finally:
             session.close()
 
-    def remove_j2c_entry(self, channel_or_category_id: int | str):
+    def _delete_j2c(self, cid: str):
         session = self._ensure_session()
-        cid = str(channel_or_category_id)
         try:
             obj = session.get(J2CState, cid)
             if obj:
                 session.delete(obj)
                 session.commit()
+        except Exception as e:
+            if self.logger:
+                self.logger.error(f"J2C-Eintrag konnte nicht gelöscht werden ({cid}): {e}")
         finally:
             session.close()
 
+    def add_j2c_clone(self, guild_id: int | str, channel_id: int | str, name: Optional[str] = None):
+        self._ensure_j2c_loaded()
+        entry = {
+            "channel_id": str(channel_id), "guild_id": str(guild_id), "kind": "clone",
+            "category_id": None, "voice_channel_id": None, "name": name,
+        }
+        with self._j2c_lock:
+            self._j2c_index(entry)
+        self._db_executor.submit(self._persist_j2c, dict(entry))
+
+    def add_j2c_category(self, guild_id: int | str, category_id: int | str, voice_channel_id: int | str, name: Optional[str] = None):
+        self._ensure_j2c_loaded()
+        entry = {
+            "channel_id": str(category_id), "guild_id": str(guild_id), "kind": "category",
+            "category_id": str(category_id), "voice_channel_id": str(voice_channel_id), "name": name,
+        }
+        with self._j2c_lock:
+            self._j2c_index(entry)
+        self._db_executor.submit(self._persist_j2c, dict(entry))
+
+    def remove_j2c_entry(self, channel_or_category_id: int | str):
+        self._ensure_j2c_loaded()
+        cid = str(channel_or_category_id)
+        with self._j2c_lock:
+            entry = self._j2c_entries.get(cid)
+            if entry is None:
+                return
+            self._j2c_unindex(entry)
+        self._db_executor.submit(self._delete_j2c, cid)
+
     def list_j2c_entries(self, guild_id: int | str) -> List[Dict[str, Any]]:
-        session = self._ensure_session()
-        try:
-            rows = session.query(J2CState).filter(J2CState.guild_id == str(guild_id)).all()
-            return [
-                {
-                    "channel_id": r.channel_id,
-                    "guild_id": r.guild_id,
-                    "kind": r.kind,
-                    "category_id": r.category_id,
-                    "voice_channel_id": r.voice_channel_id,
-                    "name": r.name,
-                }
-                for r in rows
-            ]
-        finally:
-            session.close()
+        self._ensure_j2c_loaded()
+        with self._j2c_lock:
+            return [dict(e) for e in self._j2c_by_guild.get(str(guild_id), {}).values()]
+
+    def get_j2c_clone(self, channel_id: int | str) -> Optional[Dict[str, Any]]:
+        """O(1): J2C-Eintrag eines geklonten Voice-Channels"""
+        self._ensure_j2c_loaded()
+        entry = self._j2c_entries.get(str(channel_id))
+        if entry is None or entry["kind"] != "clone":
+            return None
+        return dict(entry)
+
+    def get_j2c_category_by_voice(self, voice_channel_id: int | str) -> Optional[Dict[str, Any]]:
+        """O(1): J2C-Kategorie-Eintrag anhand des zugehörigen Voice-Channels"""
+        self._ensure_j2c_loaded()
+        entry = self._j2c_by_voice.get(str(voice_channel_id))
+        return dict(entry) if entry is not None else None
+
+    # --- Async API (läuft im DB-Thread, blockiert den Event-Loop nicht) ---
+    async def _run_db(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._db_executor, functools.partial(func, *args))
+
+    async def aget_config(self, guild_id: int | str) -> Dict[str, Any]:
+        cached = self._cache_get(str(guild_id))
+        if cached is not None:
+            return _copy_config(cached)
+        return await self._run_db(self.get_config, guild_id)
+
+    async def aupdate_config(self, guild_id: int | str, updates: Dict[str, Any]) -> Dict[str, Any]:
+        cfg = await self._run_db(self.update_config, guild_id, updates)
+        self._notify_config_listeners(int(guild_id), set(updates))
+        return cfg
+
+    async def apoll_external_changes(self):
+        """Übernimmt externe Änderungen (z.B. Dashboard) in den Cache und benachrichtigt die Listener"""
+        changes = await self._run_db(self.check_external_changes)
+        for guild_id, keys in changes.items():
+            logging.getLogger('discord_bot').info(f"Config von Guild {guild_id} extern geändert: {sorted(keys)}")
+            self._notify_config_listeners(guild_id, keys)
+
+    async def _watch_external_changes(self, interval: float):
+        while True:
+            try:
+                await self.apoll_external_changes()
+            except Exception as e:
+                logging.getLogger('discord_bot').warning(f"Prüfung auf Config-Änderungen fehlgeschlagen: {e}")
+            await asyncio.sleep(interval)
+
+    def start_config_watch(self, interval: float = CONFIG_POLL_SECONDS):
+        """Startet die periodische Prüfung auf externe Config-Änderungen (einmal, im laufenden Loop)"""
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.get_running_loop().create_task(self._watch_external_changes(interval))
+
+    # --- Config-Listener (laufen im Event-Loop) ---
+    def add_config_listener(self, callback: Callable[[int, Set[str]], None]):
+        if callback not in self._config_listeners:
+            self._config_listeners.append(callback)
+
+    def remove_config_listener(self, callback: Callable[[int, Set[str]], None]):
+        if callback in self._config_listeners:
+            self._config_listeners.remove(callback)
+
+    def _notify_config_listeners(self, guild_id: int, keys: Set[str]):
+        for callback in list(self._config_listeners):
+            try:
+                callback(guild_id, keys)
+            except Exception as e:
+                logging.getLogger('discord_bot').error(f"Config-Listener fehlgeschlagen: {e}")
+
+    async def aload_j2c(self):
+        """Lädt die J2C-Registry einmalig im DB-Thread (danach no-op)"""
+        if not self._j2c_loaded:
+            await self._run_db(self._ensure_j2c_loaded)
+
+    async def aadd_j2c_clone(self, guild_id: int | str, channel_id: int | str, name: Optional[str] = None):
+        await self.aload_j2c()
+        self.add_j2c_clone(guild_id, channel_id, name)
+
+    async def aadd_j2c_category(self, guild_id: int | str, category_id: int | str, voice_channel_id: int | str, name: Optional[str] = None):
+        await self.aload_j2c()
+        self.add_j2c_category(guild_id, category_id, voice_channel_id, name)
+
+    async def aremove_j2c_entry(self, channel_or_category_id: int | str):
+        await self.aload_j2c()
+        self.remove_j2c_entry(channel_or_category_id)
+
+    async def alist_j2c_entries(self, guild_id: int | str) -> List[Dict[str, Any]]:
+        await self.aload_j2c()
+        return self.list_j2c_entries(guild_id)
+
+    def close(self):
+        """Wartet auf ausstehende DB-Operationen und beendet den DB-Thread"""
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            self._watch_task = None
+        self._db_executor.shutdown(wait=True)
+        if self._watch_conn is not None:
+            self._watch_conn.close()
+            self._watch_conn = None
 
 
 # Singleton-Instanz
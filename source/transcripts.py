@@ -0,0 +1,124 @@
+"""
+Archivierung von Ticket-Verläufen.
+Der Channel-Verlauf wird seitenweise als gzip-JSONL unter data/transcripts geschrieben,
+ohne den ganzen Verlauf im Speicher zu halten. Anhänge werden content-addressed
+(SHA-256) abgelegt - identische Dateien landen nur einmal auf der Platte.
+"""
+
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+
+import discord
+
+from source.paths import get_transcripts_dir
+
+
+logger = logging.getLogger('discord_bot')
+
+TRANSCRIPT_PAGE_SIZE = 100  # Nachrichten pro Schreibvorgang (= eine History-Seite)
+ATTACHMENT_MAX_BYTES = 25 * 1024 * 1024  # größere Anhänge werden nur als URL vermerkt
+
+
+@dataclass
+class Transcript:
+    path: str  # relativ zu data/transcripts
+    message_count: int
+    attachment_count: int
+
+
+def _attachments_dir() -> str:
+    return os.path.join(get_transcripts_dir(), "attachments")
+
+
+def _store_attachment(data: bytes, filename: str) -> str:
+    """Schreibt einen Anhang unter seinem SHA-256 (falls noch nicht vorhanden)"""
+    digest = hashlib.sha256(data).hexdigest()
+    ext = os.path.splitext(filename)[1].lower()[:16]
+    folder = os.path.join(_attachments_dir(), digest[:2])
+    path = os.path.join(folder, f"{digest}{ext}")
+    if not os.path.exists(path):
+        os.makedirs(folder, exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return digest
+
+
+def _write_lines(file, lines: list[str]):
+    file.write("".join(lines).encode("utf-8"))
+
+
+def _finish(file, tmp_path: str, final_path: str):
+    """gzip schließen, auf die Platte bringen und atomar umbenennen"""
+    file.close()
+    with open(tmp_path, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp_path, final_path)
+
+
+async def _serialize(message: discord.Message) -> tuple[str, int]:
+    attachments = []
+    for attachment in message.attachments:
+        entry = {"filename": attachment.filename, "size": attachment.size, "url": attachment.url}
+        if attachment.size <= ATTACHMENT_MAX_BYTES:
+            try:
+                data = await attachment.read()
+                entry["sha256"] = await asyncio.to_thread(_store_attachment, data, attachment.filename)
+            except Exception as e:
+                logger.warning(f"Anhang {attachment.filename} konnte nicht archiviert werden: {e}")
+        attachments.append(entry)
+
+    record = {
+        "id": message.id,
+        "author_id": message.author.id,
+        "author": str(message.author),
+        "created_at": message.created_at.isoformat(),
+        "content": message.content,
+        "attachments": attachments,
+        "embeds": [embed.to_dict() for embed in message.embeds],
+    }
+    return json.dumps(record, ensure_ascii=False) + "\n", len(attachments)
+
+
+async def archive_channel(channel: discord.TextChannel) -> Transcript:
+    """
+    Streamt den kompletten Verlauf eines Channels in eine gzip-JSONL-Datei.
+    Kehrt erst zurück, wenn die Datei vollständig geschrieben ist.
+    """
+    relative = os.path.join(str(channel.guild.id), f"{channel.id}-{int(time.time())}.jsonl.gz")
+    final_path = os.path.join(get_transcripts_dir(), relative)
+    tmp_path = f"{final_path}.tmp"
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+
+    file = await asyncio.to_thread(gzip.open, tmp_path, "wb")
+    message_count = attachment_count = 0
+    try:
+        page: list[str] = []
+        async for message in channel.history(limit=None, oldest_first=True):
+            line, attachments = await _serialize(message)
+            page.append(line)
+            attachment_count += attachments
+            if len(page) >= TRANSCRIPT_PAGE_SIZE:
+                await asyncio.to_thread(_write_lines, file, page)
+                message_count += len(page)
+                page = []
+        if page:
+            await asyncio.to_thread(_write_lines, file, page)
+            message_count += len(page)
+        await asyncio.to_thread(_finish, file, tmp_path, final_path)
+    except BaseException:
+        file.close()
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return Transcript(path=relative, message_count=message_count, attachment_count=attachment_count)